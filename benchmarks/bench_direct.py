@@ -0,0 +1,123 @@
+"""Benchmark: buffered vs O_DIRECT overwrite passes, throughput and page cache pollution.
+
+For each write path a target file is overwritten and left in place, then
+mincore() reports how much of it the passes left in the page cache, and
+how much of a previously read "hot" file is still cached (which only drops
+when the machine is short of memory, as on a busy database host).
+
+Run with:  python -m benchmarks.bench_direct [--mib 512] [--passes 3] [--hot-mib 256] [--dir PATH]
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+
+from erasure.direct import O_DIRECT
+from erasure.verify import drop_cache
+from erasure.overwrite import Overwriter
+from utils.logger import Logger
+from utils.progress import Reporter
+
+
+MIB = 1024 * 1024
+
+
+def cached_bytes(path):
+    """Bytes of a file resident in the page cache, via mincore(); None if unavailable"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    if not hasattr(libc, 'mincore'):
+        return None
+    pages = -(-size // mmap.PAGESIZE)
+    vec = (ctypes.c_ubyte * pages)()
+    with open(path, 'rb') as f:
+        region = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_COPY)
+    try:
+        anchor = ctypes.c_char.from_buffer(region)
+        try:
+            if libc.mincore(ctypes.c_void_p(ctypes.addressof(anchor)), ctypes.c_size_t(size), vec) != 0:
+                return None
+        finally:
+            del anchor
+    finally:
+        region.close()
+    return sum(1 for page in vec if page & 1) * mmap.PAGESIZE
+
+
+def make_file(path, size):
+    with open(path, 'wb') as f:
+        block = os.urandom(MIB)
+        for _ in range(size // MIB):
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+        drop_cache(f.fileno())
+
+
+def bench_mode(direct, workdir, hot_path, args):
+    name = 'direct' if direct else 'buffered'
+    path = os.path.join(workdir, f"{name}.bin")
+    size = args.mib * MIB
+    make_file(path, size)
+    # Warm the hot file, as a database's working set would be
+    with open(hot_path, 'rb') as f:
+        while f.read(MIB):
+            pass
+
+    overwriter = Overwriter(Logger(os.path.join(workdir, f"{name}.csv"), echo=False), reporter=Reporter(),
+                            direct=direct)
+    start = time.perf_counter()
+    with open(path, 'r+b') as f:
+        handle = None
+        if direct:
+            handle = overwriter._open_direct(lambda: os.open(path, os.O_RDWR | O_DIRECT), path)
+        try:
+            for i in range(args.passes):
+                overwriter._write_pass(f, size, direct=handle)
+                f.flush()
+                overwriter.durability.after_pass(f.fileno(), i, args.passes)
+        finally:
+            if handle is not None:
+                handle.close()
+    elapsed = time.perf_counter() - start
+
+    target_cached = cached_bytes(path)
+    hot_cached = cached_bytes(hot_path)
+    os.remove(path)
+    return {
+        'direct_io': handle is not None,
+        'seconds': round(elapsed, 3),
+        'mb_per_s': round(size * args.passes / elapsed / 1e6, 1),
+        'target_cached_mib': None if target_cached is None else round(target_cached / MIB, 1),
+        'hot_cached_pct': None if hot_cached is None else round(100 * hot_cached / (args.hot_mib * MIB), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buffered vs direct I/O benchmark")
+    parser.add_argument("--mib", type=int, default=512, help="Size of the overwritten file")
+    parser.add_argument("--passes", type=int, default=3)
+    parser.add_argument("--hot-mib", type=int, default=256, help="Size of the file kept hot in the page cache")
+    parser.add_argument("--dir", default=None, help="Directory on the filesystem to benchmark")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench-direct-", dir=args.dir)
+    try:
+        hot_path = os.path.join(workdir, "hot.bin")
+        make_file(hot_path, args.hot_mib * MIB)
+        results = {('direct' if direct else 'buffered'): bench_mode(direct, workdir, hot_path, args)
+                   for direct in (False, True)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark: cost of each durability policy on small and large files.
+
+Run with:  python -m benchmarks.bench_durability [--small 500] [--large 2] [--large-mib 64]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from erasure.durability import POLICIES
+from erasure.overwrite import Overwriter
+from utils.logger import Logger
+
+
+def make_tree(root, small, large, large_size):
+    os.makedirs(root)
+    for i in range(small):
+        with open(os.path.join(root, f"small{i}.bin"), 'wb') as f:
+            f.write(os.urandom(4096))
+    for i in range(large):
+        with open(os.path.join(root, f"large{i}.bin"), 'wb') as f:
+            f.truncate(large_size)
+            f.seek(0)
+            f.write(os.urandom(min(large_size, 1024 * 1024)))
+
+
+def bench_policy(policy, workdir, args):
+    root = os.path.join(workdir, policy)
+    make_tree(root, args.small, args.large, args.large_mib * 1024 * 1024)
+    logger = Logger(os.path.join(workdir, f"{policy}.csv"), echo=False)
+    overwriter = Overwriter(logger, durability=policy, sync_every=args.sync_every)
+    os.sync()
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        ok = overwriter.process_path(root, args.passes)
+    elapsed = time.perf_counter() - start
+
+    files = args.small + args.large
+    total_bytes = (args.small * 4096 + args.large * args.large_mib * 1024 * 1024) * args.passes
+    return {
+        'ok': ok,
+        'seconds': round(elapsed, 3),
+        'files_per_s': round(files / elapsed, 1),
+        'mb_per_s': round(total_bytes / elapsed / 1e6, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Durability policy benchmark")
+    parser.add_argument("--small", type=int, default=500, help="Number of 4 KiB files")
+    parser.add_argument("--large", type=int, default=2, help="Number of large files")
+    parser.add_argument("--large-mib", type=int, default=64, help="Size of each large file")
+    parser.add_argument("--passes", type=int, default=3)
+    parser.add_argument("--sync-every", type=int, default=256)
+    parser.add_argument("--dir", default=None, help="Directory on the filesystem to benchmark")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench-durability-", dir=args.dir)
+    try:
+        results = {policy: bench_policy(policy, workdir, args) for policy in POLICIES}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
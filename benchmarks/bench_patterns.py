@@ -0,0 +1,58 @@
+"""Micro-benchmark: GB/s produced by each pattern source.
+
+Run with:  python -m benchmarks.bench_patterns [--mib 1024] [--chunk-mib 4]
+"""
+import argparse
+import json
+import os
+import time
+
+from erasure.patterns import SOURCES, get_source
+
+
+def bench_legacy_urandom(total, chunk_size):
+    """The pre-streaming path: a fresh os.urandom bytes object per write"""
+    start = time.perf_counter()
+    produced = 0
+    while produced < total:
+        length = min(chunk_size, total - produced)
+        os.urandom(length)
+        produced += length
+    return time.perf_counter() - start
+
+
+def bench_source(name, total, chunk_size):
+    source = get_source(name)
+    buffer = bytearray(chunk_size)
+    start = time.perf_counter()
+    produced = 0
+    while produced < total:
+        length = min(chunk_size, total - produced)
+        produced += len(source.chunk(buffer, length, produced))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pattern source throughput")
+    parser.add_argument("--mib", type=int, default=1024, help="Data generated per source")
+    parser.add_argument("--chunk-mib", type=int, default=4, help="Chunk size")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    total = args.mib * 1024 * 1024
+    chunk_size = args.chunk_mib * 1024 * 1024
+
+    results = {'os.urandom (legacy)': bench_legacy_urandom(total, chunk_size)}
+    for name in SOURCES:
+        results[name] = bench_source(name, total, chunk_size)
+
+    rates = {name: total / elapsed / 1e9 for name, elapsed in results.items()}
+    if args.json:
+        print(json.dumps({'bytes': total, 'chunk_size': chunk_size, 'gb_per_s': rates}, indent=2))
+    else:
+        for name, rate in rates.items():
+            print(f"{name:<22} {rate:8.2f} GB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Benchmark: metadata syscalls per file for the old and new erase pipelines.
+
+Counts calls by wrapping the os functions each pipeline uses, including the
+fstatat() behind os.DirEntry.stat. Uses strace -c instead when --strace is
+given and strace is installed.
+
+Run with:  python -m benchmarks.bench_walker [--files 2000] [--dirs 20]
+"""
+import argparse
+import collections
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from erasure.overwrite import Overwriter
+from erasure.durability import DurabilityPolicy
+from utils.logger import Logger
+
+
+COUNTED = ('stat', 'lstat', 'fstat', 'open', 'unlink', 'remove', 'rmdir', 'scandir')
+
+
+class _CountingDirEntry:
+    """Proxy that counts the first (uncached) stat of a DirEntry"""
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self._stat_done = False
+
+    def stat(self, *, follow_symlinks=True):
+        if not self._stat_done:
+            self._counter['fstatat'] += 1
+            self._stat_done = True
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+
+@contextlib.contextmanager
+def count_syscalls():
+    counter = collections.Counter()
+    originals = {name: getattr(os, name) for name in COUNTED}
+
+    def wrap(name, func):
+        def counted(*args, **kwargs):
+            counter[name] += 1
+            result = func(*args, **kwargs)
+            if name == 'scandir':
+                return _CountingScandir(result, counter)
+            return result
+        return counted
+
+    for name, func in originals.items():
+        setattr(os, name, wrap(name, func))
+    try:
+        yield counter
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+
+class _CountingScandir:
+    def __init__(self, it, counter):
+        self._it = it
+        self._counter = counter
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _CountingDirEntry(next(self._it), self._counter)
+
+    def close(self):
+        self._it.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+
+def make_tree(root, files, dirs):
+    for d in range(dirs):
+        os.makedirs(os.path.join(root, f"d{d}"))
+    for i in range(files):
+        with open(os.path.join(root, f"d{i % dirs}", f"f{i}"), 'wb') as f:
+            f.write(b"x" * 512)
+
+
+def legacy_pipeline(root, logger):
+    """The pre-walker sequence: os.walk plus exists/isfile/getsize per file,
+    and Logger re-checking exists/getsize on the deleted path"""
+    for dirpath, dirs, files in os.walk(root, topdown=False):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            os.path.exists(path)
+            os.path.isfile(path)
+            size = os.path.getsize(path)
+            with open(path, 'r+b') as f:
+                f.write(b"\0" * size)
+            os.remove(path)
+            if os.path.exists(path):
+                os.path.getsize(path)
+            logger.log(path, 1, True, file_size=size)
+        for name in dirs:
+            os.rmdir(os.path.join(dirpath, name))
+    os.rmdir(root)
+
+
+def walker_pipeline(root, logger):
+    overwriter = Overwriter(logger, pattern='zeros')
+    # No syncing, to match the legacy replica; only metadata traffic differs
+    overwriter.durability = DurabilityPolicy()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        overwriter.process_path(root, passes=1)
+
+
+def run(pipeline, workdir, args):
+    root = os.path.join(workdir, pipeline.__name__)
+    make_tree(root, args.files, args.dirs)
+    logger = Logger(os.path.join(workdir, pipeline.__name__ + ".csv"), echo=False)
+    start = time.perf_counter()
+    with count_syscalls() as counter:
+        pipeline(root, logger)
+    elapsed = time.perf_counter() - start
+    metadata = sum(v for k, v in counter.items() if k in ('stat', 'lstat', 'fstat', 'fstatat'))
+    return {
+        'seconds': round(elapsed, 3),
+        'calls': dict(counter),
+        'metadata_calls_per_file': round(metadata / args.files, 2),
+    }
+
+
+def run_strace(args):
+    """Whole-process syscall summary for the walker pipeline via strace -c"""
+    code = ("import sys; sys.argv = ['bench', '--files', %r, '--dirs', %r, '--only-walker'];"
+            "from benchmarks.bench_walker import main; main()" % (str(args.files), str(args.dirs)))
+    return subprocess.run(['strace', '-f', '-c', sys.executable, '-c', code],
+                          capture_output=True, text=True).stderr
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Syscalls per file: os.walk pipeline vs scandir walker")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--dirs", type=int, default=20)
+    parser.add_argument("--strace", action="store_true", help="Also print an strace -c summary")
+    parser.add_argument("--only-walker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench-walker-")
+    try:
+        pipelines = [walker_pipeline] if args.only_walker else [legacy_pipeline, walker_pipeline]
+        results = {p.__name__: run(p, workdir, args) for p in pipelines}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+    if args.strace and not args.only_walker and shutil.which('strace'):
+        print(run_strace(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Erasure benchmark harness.
+
+Generates synthetic trees, erases them with Overwriter.process_path across a
+matrix of pass counts and modes, and reports MB/s, files/s, p50/p99 per-file
+latency and peak RSS as JSON. Each case runs in a fresh child process so the
+RSS figures are not polluted by earlier cases.
+
+    python -m benchmarks                         # run and print JSON
+    python -m benchmarks --save baseline.json    # keep results as a baseline
+    python -m benchmarks --compare baseline.json # fail on regressions
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from erasure.overwrite import Overwriter
+from utils.logger import Logger
+from utils.progress import Reporter
+
+
+KIB = 1024
+MIB = 1024 * 1024
+
+
+def _write_file(path, size, data_size=None):
+    """Create a file of logical `size`; only the first `data_size` bytes are allocated"""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        f.seek(0)
+        f.write(b"\xa5" * min(size, data_size if data_size is not None else size))
+
+
+def make_tiny(root, scale):
+    """Many tiny files spread over a few directories"""
+    count = int(2000 * scale)
+    for d in range(20):
+        os.makedirs(os.path.join(root, f"d{d}"))
+    for i in range(count):
+        _write_file(os.path.join(root, f"d{i % 20}", f"f{i}"), KIB)
+    return count, count * KIB
+
+
+def make_huge(root, scale):
+    """A few large fully-allocated files"""
+    os.makedirs(root)
+    size = int(64 * MIB * scale)
+    for i in range(2):
+        _write_file(os.path.join(root, f"huge{i}.bin"), size)
+    return 2, 2 * size
+
+
+def make_sparse(root, scale):
+    """Large logical files with only a small allocated region"""
+    os.makedirs(root)
+    size = int(64 * MIB * scale)
+    for i in range(4):
+        _write_file(os.path.join(root, f"sparse{i}.img"), size, data_size=4 * MIB)
+    return 4, 4 * size
+
+
+def make_deep(root, scale):
+    """A deeply nested chain of directories with a few files at each level"""
+    depth = max(1, int(50 * scale))
+    path = root
+    count = 0
+    for level in range(depth):
+        path = os.path.join(path, f"level{level}")
+        os.makedirs(path)
+        for i in range(5):
+            _write_file(os.path.join(path, f"f{i}"), 4 * KIB)
+            count += 1
+    return count, count * 4 * KIB
+
+
+def make_mixed(root, scale):
+    """Small files of mixed sizes, with one large file the walk only reaches at the end"""
+    count = int(1000 * scale)
+    sizes = (4 * KIB, 16 * KIB, 64 * KIB, 256 * KIB)
+    for d in range(10):
+        os.makedirs(os.path.join(root, f"d{d}"))
+    total = 0
+    for i in range(count):
+        size = sizes[i % len(sizes)]
+        _write_file(os.path.join(root, f"d{i % 10}", f"f{i}"), size)
+        total += size
+    # The walker lists a directory's files before descending, so this comes last
+    large = int(256 * MIB * scale)
+    os.makedirs(os.path.join(root, "d9", "archive"))
+    _write_file(os.path.join(root, "d9", "archive", "large.bin"), large)
+    return count + 1, total + large
+
+
+TREES = {
+    'tiny': make_tiny,
+    'huge': make_huge,
+    'sparse': make_sparse,
+    'deep': make_deep,
+    'mixed': make_mixed,
+}
+
+# Overwriter keyword arguments for each benchmarked mode
+MODES = {
+    'serial': {},
+    'parallel': {'jobs': 4},
+    # Walk order and unsplit passes, as before size-aware scheduling
+    'parallel-walk-order': {'jobs': 4, 'schedule_window': 1, 'split_size': float('inf')},
+    'sparse': {'sparse': True},
+    'batch-sync': {'durability': 'batch'},
+    'verify-sample': {'verify': 'sample'},
+    'verify-full': {'verify': 'full'},
+    'direct': {'direct': True},
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_case(tree, mode, passes, scale, workdir):
+    """Build one tree and erase it; runs inside a child process"""
+    root = os.path.join(workdir, f"{tree}-{mode}-{passes}")
+    files, logical_bytes = TREES[tree](root, scale)
+    os.sync()
+
+    logger = Logger(root + ".csv", echo=False)
+    # Quiet output, as in production runs with --quiet
+    overwriter = Overwriter(logger, reporter=Reporter(), **MODES[mode])
+
+    latencies = []
+    lock = threading.Lock()
+    erase_entry = overwriter._erase_entry
+
+    def timed_erase(entry, entry_passes):
+        start = time.perf_counter()
+        try:
+            return erase_entry(entry, entry_passes)
+        finally:
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    overwriter._erase_entry = timed_erase
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        ok = overwriter.process_path(root, passes)
+    elapsed = time.perf_counter() - start
+    os.remove(root + ".csv")
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss = max_rss if sys.platform == 'darwin' else max_rss * KIB
+    return {
+        'ok': ok,
+        'files': files,
+        'logical_bytes': logical_bytes,
+        'seconds': round(elapsed, 4),
+        'mb_per_s': round(logical_bytes * passes / elapsed / 1e6, 2),
+        'files_per_s': round(files / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'peak_rss_mb': round(peak_rss / MIB, 1),
+    }
+
+
+def run_matrix(trees, modes, passes_list, scale, workdir):
+    results = {}
+    context = multiprocessing.get_context('fork')
+    for tree in trees:
+        for mode in modes:
+            for passes in passes_list:
+                key = f"{tree}/{mode}/p{passes}"
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    results[key] = pool.submit(run_case, tree, mode, passes, scale, workdir).result()
+                print(f"[i] {key}: {results[key]['mb_per_s']} MB/s, "
+                      f"{results[key]['files_per_s']} files/s", file=sys.stderr)
+    return results
+
+
+# Metrics where bigger is better; the rest regress when they grow
+HIGHER_IS_BETTER = ('mb_per_s', 'files_per_s')
+COMPARED = ('mb_per_s', 'files_per_s', 'p50_ms', 'p99_ms', 'peak_rss_mb')
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against a baseline run"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in COMPARED:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{key} {metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Secure erase benchmark suite")
+    parser.add_argument("--trees", nargs="+", choices=list(TREES), default=list(TREES))
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--passes", nargs="+", type=int, default=[1, 3])
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply file counts and sizes")
+    parser.add_argument("--dir", default=None, help="Directory on the filesystem to benchmark")
+    parser.add_argument("--output", "-o", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--save", metavar="BASELINE", default=None, help="Also save the results as a baseline")
+    parser.add_argument("--compare", metavar="BASELINE", default=None,
+                        help="Compare against a saved baseline; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="secure-erase-bench-", dir=args.dir)
+    try:
+        results = run_matrix(args.trees, args.modes, args.passes, args.scale, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    for path in filter(None, (args.output, args.save)):
+        with open(path, 'w') as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("[X] Regressions against baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("[✓] No regressions against baseline", file=sys.stderr)
+    return 0
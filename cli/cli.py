@@ -1,10 +1,69 @@
-from utils.logger import Logger
+from utils.logger import Logger, BufferedLogger
+from utils.audit_store import AuditStore
+from utils.metrics import Metrics
+from utils.progress import Reporter, VerboseReporter, ProgressReporter, JsonReporter
 from erasure.overwrite import Overwriter
+from erasure.patterns import SOURCES
+from erasure.durability import POLICIES
+from erasure.job import JobManifest
+from erasure.planner import Planner
+from erasure.freespace import FreeSpaceWiper
+from erasure.verify import Verifier
+from erasure.schemes import SCHEMES
+from erasure.daemon import EraseDaemon, request as daemon_request
+from cli.path_input import read_paths, unique_paths
+from config import (DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE, DEFAULT_PATTERN, DEFAULT_JOBS,
+                    DEFAULT_DURABILITY, SYNC_BATCH_FILES, VERIFY_SAMPLES, DEFAULT_PASSES,
+                    FREE_SPACE_RESERVE, FREE_SPACE_WORKERS, DAEMON_WORKERS)
 import argparse
+import cProfile
+import json
+import os
+import signal
+import sys
+import threading
+
+
+def positive_int(value):
+    """argparse type for options that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError("value must be at least 1")
+    return number
+
+
+def mib(value):
+    """argparse type for a non-negative size given in MiB"""
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value}")
+    if size < 0:
+        raise argparse.ArgumentTypeError("size must not be negative")
+    return size * 1024 * 1024
+
+
+def chunk_size_mib(value):
+    """argparse type for --chunk-size, given in MiB"""
+    try:
+        size = int(value) * 1024 * 1024
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid chunk size: {value}")
+    if not MIN_CHUNK_SIZE <= size <= MAX_CHUNK_SIZE:
+        raise argparse.ArgumentTypeError(
+            f"chunk size must be between {MIN_CHUNK_SIZE // (1024 * 1024)} "
+            f"and {MAX_CHUNK_SIZE // (1024 * 1024)} MiB"
+        )
+    return size
 
 
 class SecureEraseCLI:
     def __init__(self):
+        self.metrics = None
+        self.reporter = VerboseReporter()
         self.logger = Logger()
         self.overwriter = Overwriter(self.logger)
         self.parser = argparse.ArgumentParser(description="Secure Erase Tool")
@@ -12,7 +71,83 @@ class SecureEraseCLI:
     
     def setup_arguments(self):
         self.parser.add_argument("paths", nargs="*", help="Files or folders to erase")
+        self.parser.add_argument("--from-file", metavar="LIST", default=None,
+                                 help="Also erase the paths listed in this file, one per line")
+        self.parser.add_argument("--stdin", action="store_true",
+                                 help="Also erase the paths read from standard input, one per line")
+        self.parser.add_argument("-0", "--null", action="store_true",
+                                 help="Paths in --from-file or on stdin are separated by NUL bytes, not newlines")
         self.parser.add_argument("--passes", type=int, default=None, help="Number of overwrite passes")
+        self.parser.add_argument("--method", choices=list(SCHEMES), default=None,
+                                 help="Named overwrite method, which fixes the passes: "
+                                      + ", ".join(f"{name} ({scheme.description})" for name, scheme in SCHEMES.items()))
+        self.parser.add_argument("--chunk-size", type=chunk_size_mib, default=DEFAULT_CHUNK_SIZE,
+                                 help="Size in MiB of the buffer each pass is streamed through (1-64)")
+        self.parser.add_argument("--pattern", choices=sorted(SOURCES), default=DEFAULT_PATTERN,
+                                 help=f"Data written by each pass (default: {DEFAULT_PATTERN})")
+        self.parser.add_argument("--jobs", "-j", type=positive_int, default=DEFAULT_JOBS,
+                                 help="Number of files erased concurrently in directory mode")
+        self.parser.add_argument("--jobs-per-device", type=positive_int, default=None,
+                                 help="Concurrency limit per block device (default: 1 for spinning disks, --jobs otherwise)")
+        self.parser.add_argument("--durability", choices=list(POLICIES), default=DEFAULT_DURABILITY,
+                                 help="When overwritten data is synced to disk: after every pass, after the "
+                                      "final pass, with streaming writeback, or in batches of --sync-every files "
+                                      f"(default: {DEFAULT_DURABILITY})")
+        self.parser.add_argument("--sync-every", type=positive_int, default=SYNC_BATCH_FILES,
+                                 help="Files between sync barriers with --durability batch")
+        self.parser.add_argument("--sparse", action="store_true",
+                                 help="Overwrite only the allocated extents of sparse files, skipping holes")
+        self.parser.add_argument("--direct", action="store_true",
+                                 help="Write passes with O_DIRECT, bypassing the page cache so erasing does not "
+                                      "evict other programs' cached data (falls back where unsupported)")
+        self.parser.add_argument("--verify", choices=Verifier.MODES, default=None,
+                                 help="Read the final pass back from the device and check it: every byte, "
+                                      "or --verify-samples random blocks per file")
+        self.parser.add_argument("--verify-samples", type=positive_int, default=VERIFY_SAMPLES,
+                                 help=f"Blocks read back per file with --verify sample (default: {VERIFY_SAMPLES})")
+        self.parser.add_argument("--buffered-log", action="store_true",
+                                 help="Batch audit log writes in the background instead of one write per file")
+        self.parser.add_argument("--audit-db", metavar="PATH", default=None,
+                                 help="Record erasures in an indexed SQLite audit database instead of the CSV log")
+        self.parser.add_argument("--import-csv", metavar="CSV", default=None,
+                                 help="Import an existing CSV erasure log into --audit-db and exit")
+        self.parser.add_argument("--job-file", metavar="PATH", default=None,
+                                 help="Record the plan and per-file progress in a resumable job manifest")
+        self.parser.add_argument("--resume", action="store_true",
+                                 help="Continue the interrupted job recorded in --job-file")
+        self.parser.add_argument("--wipe-free-space", metavar="MOUNTPOINT", default=None,
+                                 help="Overwrite the free space of the filesystem holding MOUNTPOINT with fill files")
+        self.parser.add_argument("--reserve", type=mib, default=FREE_SPACE_RESERVE,
+                                 help="MiB to leave free when wiping free space; as root the blocks reserved "
+                                      f"for root are wiped too (default: {FREE_SPACE_RESERVE // (1024 * 1024)})")
+        service = self.parser.add_mutually_exclusive_group()
+        service.add_argument("--daemon", metavar="SOCKET", default=None,
+                             help="Run as a daemon erasing jobs submitted through this Unix socket")
+        service.add_argument("--submit", metavar="SOCKET", default=None,
+                             help="Submit the paths as a job to the daemon on SOCKET and wait for it")
+        service.add_argument("--status", metavar="SOCKET", default=None,
+                             help="Print the job queue of the daemon on SOCKET as JSON")
+        self.parser.add_argument("--priority", type=int, default=0,
+                                 help="Priority of a --submit job; higher runs first (default: 0)")
+        self.parser.add_argument("--no-wait", action="store_true",
+                                 help="With --submit, return once the job is queued")
+        self.parser.add_argument("--plan", action="store_true",
+                                 help="Dry run: report files, bytes and an ETA per device without erasing anything")
+        self.parser.add_argument("--eta", action="store_true",
+                                 help="Scan directory targets before erasing so the progress display can show "
+                                      "an ETA (every file is stat'ed twice)")
+        output = self.parser.add_mutually_exclusive_group()
+        output.add_argument("--verbose", "-v", action="store_true",
+                            help="Print a line for every file instead of the aggregate progress display")
+        output.add_argument("--quiet", "-q", action="store_true", help="Only print errors")
+        output.add_argument("--json", action="store_true",
+                            help="Print one JSON object per completed file (NDJSON) and nothing else")
+        self.parser.add_argument("--metrics-json", metavar="PATH", default=None,
+                                 help="Write per-phase timings and counters for the run as JSON")
+        self.parser.add_argument("--metrics-prom", metavar="PATH", default=None,
+                                 help="Write the run metrics as a Prometheus textfile-collector file")
+        self.parser.add_argument("--profile", metavar="PATH", default=None,
+                                 help="Run under cProfile and dump the stats to PATH")
 
     def get_paths_interactively(self):
         print("\n[Interactive Mode]")
@@ -47,33 +182,351 @@ class SecureEraseCLI:
                 print("Invalid input. Please enter a valid number.")
                 continue
 
+    def _build_reporter(self, args):
+        """Create the progress output selected by the command-line options"""
+        if args.json:
+            return JsonReporter()
+        if args.quiet:
+            return Reporter(sys.stderr)
+        if args.verbose:
+            return VerboseReporter()
+        return ProgressReporter()
+
+    def _build_logger(self, args):
+        """Create the audit logger selected by the command-line options"""
+        # Echoing every row to the console is part of the verbose output only
+        if args.audit_db:
+            return AuditStore(args.audit_db, echo=args.verbose)
+        if args.buffered_log:
+            return BufferedLogger(echo=args.verbose)
+        return Logger(echo=args.verbose)
+
+    def _build_overwriter(self, args):
+        """Create the Overwriter configured by the command-line options"""
+        return Overwriter(
+            self.logger,
+            chunk_size=args.chunk_size,
+            pattern=args.pattern,
+            jobs=args.jobs,
+            jobs_per_device=args.jobs_per_device,
+            durability=args.durability,
+            sync_every=args.sync_every,
+            sparse=args.sparse,
+            metrics=self.metrics,
+            verify=args.verify,
+            verify_samples=args.verify_samples,
+            method=args.method,
+            reporter=self.reporter,
+            direct=args.direct,
+        )
+
     def run(self):
         args = self.parser.parse_args()
+        if args.import_csv and not args.audit_db:
+            self.parser.error("--import-csv requires --audit-db")
+        if args.audit_db and args.buffered_log:
+            self.parser.error("--buffered-log batches CSV writes and cannot be combined with --audit-db")
+        if args.resume and not args.job_file:
+            self.parser.error("--resume requires --job-file")
+        if args.plan and (args.resume or args.job_file):
+            self.parser.error("--plan cannot be combined with --job-file or --resume")
+        if args.from_file and args.stdin:
+            self.parser.error("--from-file and --stdin cannot be combined")
+        if args.stdin and args.job_file:
+            self.parser.error("--stdin cannot be resumed; use --from-file with --job-file")
+        if args.null and not (args.from_file or args.stdin):
+            self.parser.error("-0 requires --from-file or --stdin")
+        if (args.daemon or args.submit or args.status) and (args.plan or args.job_file or args.wipe_free_space):
+            self.parser.error("--daemon, --submit and --status cannot be combined with --plan, "
+                              "--job-file or --wipe-free-space")
+
+        self.metrics = Metrics() if (args.metrics_json or args.metrics_prom) else None
+        self.reporter = self._build_reporter(args)
+        self.logger = self._build_logger(args)
+        if self.metrics is not None:
+            self.logger.metrics = self.metrics
+        try:
+            self.overwriter = self._build_overwriter(args)
+        except ValueError as e:
+            self.parser.error(str(e))
+
+        profiler = cProfile.Profile() if args.profile else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            if args.daemon:
+                self._serve(args)
+            elif args.submit:
+                self._submit(args)
+            elif args.status:
+                self._daemon_status(args)
+            elif args.wipe_free_space:
+                self._wipe_free_space(args)
+            elif args.import_csv:
+                count = self.logger.import_csv(args.import_csv)
+                self.reporter.notice(f"[✓] Imported {count} rows from {args.import_csv} into {args.audit_db}")
+            else:
+                self._erase_paths(args)
+        finally:
+            self.logger.close()
+            self.reporter.close()
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+                self.reporter.notice(f"[i] Profile written to {args.profile}")
+            self._write_metrics(args)
+
+    def _write_metrics(self, args):
+        """Export the run's metrics in the formats that were asked for"""
+        if self.metrics is None:
+            return
+        self.metrics.finish()
+        if args.metrics_json:
+            self.metrics.write_json(args.metrics_json)
+            self.reporter.notice(f"[i] Metrics written to {args.metrics_json}")
+        if args.metrics_prom:
+            self.metrics.write_prometheus(args.metrics_prom)
+            self.reporter.notice(f"[i] Prometheus metrics written to {args.metrics_prom}")
+
+    def _resolve_passes(self, args, ask=True):
+        """Passes from --method, --passes, the prompt or the default, in that order"""
+        if args.method:
+            passes = SCHEMES[args.method].passes
+            if args.passes is not None and args.passes != passes:
+                self.reporter.warning(f"[!] --method {args.method} always uses {passes} passes; "
+                                      f"ignoring --passes {args.passes}")
+            return passes
+        if args.passes is not None:
+            return args.passes
+        if ask:
+            return self._get_passes_interactively()
+        return DEFAULT_PASSES
+
+    def _wipe_free_space(self, args):
+        """Overwrite the free space of a volume and record it in the audit log"""
+        passes = self._resolve_passes(args, ask=False)
+        workers = args.jobs if args.jobs > 1 else FREE_SPACE_WORKERS
+        wiper = FreeSpaceWiper(self.overwriter, reserve=args.reserve, workers=workers)
+        try:
+            wiped = wiper.wipe(args.wipe_free_space, passes)
+        except OSError as e:
+            self.reporter.error(f"[X] Free space wipe failed on {args.wipe_free_space}: {e}")
+            self.logger.log(args.wipe_free_space, passes, success=False)
+            return False
+        self.logger.log(args.wipe_free_space, passes, success=True, file_size=wiped, bytes_overwritten=wiped)
+        return True
+
+    def _serve(self, args):
+        """Erase jobs submitted over a Unix socket until SIGTERM, SIGINT or a shutdown request"""
+        workers = args.jobs if args.jobs > 1 else DAEMON_WORKERS
+        daemon = EraseDaemon(self.overwriter, args.daemon, passes=self._resolve_passes(args, ask=False),
+                             workers=workers)
+        try:
+            daemon.start()
+        except OSError as e:
+            self.reporter.error(f"[X] Cannot listen on {args.daemon}: {e}")
+            return
+
+        def stop(signum, frame):
+            # shutdown() waits for the running batch, so it must not block the handler
+            threading.Thread(target=daemon.shutdown, name='daemon-shutdown').start()
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            daemon.wait()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def _daemon_call(self, socket_path, message):
+        """Send a request to the daemon; returns its reply, or None after reporting why not"""
+        try:
+            reply = daemon_request(socket_path, message)
+        except (OSError, ValueError) as e:
+            self.reporter.error(f"[X] Cannot reach the erase daemon at {socket_path}: {e}")
+            return None
+        if not reply.get('ok'):
+            self.reporter.error(f"[X] Erase daemon refused the request: {reply.get('error')}")
+            return None
+        return reply
+
+    def _submit(self, args):
+        """Hand the paths to a running daemon as one job, and wait for it unless --no-wait"""
+        if not (args.paths or args.from_file or args.stdin):
+            self.parser.error("--submit needs paths, --from-file or --stdin")
+        try:
+            paths = list(self._input_paths(args.paths, args.from_file, args.stdin, args.null))
+        except OSError as e:
+            self.reporter.error(f"[X] Cannot read path list: {e}")
+            return
+        # Left to the daemon's own --passes/--method unless given here
+        passes = self._resolve_passes(args, ask=False) if (args.passes or args.method) else None
+        reply = self._daemon_call(args.submit, {'op': 'submit', 'paths': [os.path.abspath(p) for p in paths],
+                                                'passes': passes, 'priority': args.priority})
+        if reply is None:
+            return
+        job_id = reply['job']
+        self.reporter.notice(f"[i] Submitted job {job_id} with {len(paths)} path(s) to {args.submit}")
+        if args.no_wait:
+            return
+        reply = self._daemon_call(args.submit, {'op': 'wait', 'job': job_id})
+        if reply is None:
+            return
+        job = reply['job']
+        if args.json:
+            print(json.dumps(job))
+            return
+        for path, success in job['results'].items():
+            if not success:
+                self.reporter.error(f"[X] Failed to erase: {path}")
+        if job['state'] != 'done':
+            self.reporter.warning(f"[!] Job {job_id} was {job['state']} before it ran")
+        self.reporter.notice(f"\nOperation completed: {job['succeeded']}/{job['paths']} paths processed successfully.")
+
+    def _daemon_status(self, args):
+        """Print the daemon's queue and recent jobs"""
+        reply = self._daemon_call(args.status, {'op': 'status'})
+        if reply is not None:
+            print(json.dumps(reply, indent=2))
+
+    def _erase_paths(self, args):
+        """Collect the paths and passes, then erase each path"""
+        if args.resume:
+            return self._resume_job(args)
 
         # BUG FIX: Properly assign variables
-        if args.paths:
-            paths = args.paths 
+        if args.paths or args.from_file or args.stdin:
+            command_line_paths = args.paths
         else: 
-            paths = self.get_paths_interactively()  # Fixed: assign the return value
-            if not paths:  # Exit if no paths provided
+            command_line_paths = self.get_paths_interactively()  # Fixed: assign the return value
+            if not command_line_paths:  # Exit if no paths provided
                 return
+        try:
+            paths = self._input_paths(command_line_paths, args.from_file, args.stdin, args.null)
+        except OSError as e:
+            self.reporter.error(f"[X] Cannot read path list: {e}")
+            return
 
         # BUG FIX: Properly assign passes variable
-        if args.passes is not None:
-            passes = args.passes  
+        # Standard input carries the paths, so there is nobody to ask
+        passes = self._resolve_passes(args, ask=not args.stdin)  # Fixed: assign the return value
+
+        if args.plan:
+            return self._plan(paths, passes, as_json=args.json)
+        if self.reporter.wants_progress and not (args.from_file or args.stdin):
+            self._expect(command_line_paths, passes, scan_trees=args.eta)
+
+        job = None
+        if args.job_file:
+            try:
+                # A path list is re-read on resume rather than copied into the manifest
+                job = JobManifest.create(args.job_file, command_line_paths, passes,
+                                         options={'pattern': args.pattern, 'sparse': args.sparse,
+                                                  'verify': args.verify, 'method': args.method,
+                                                  'from_file': args.from_file and os.path.abspath(args.from_file),
+                                                  'null': args.null, 'cwd': os.getcwd()})
+            except FileExistsError as e:
+                self.reporter.error(f"[X] {e}")
+                return
+        self._run_erasure(paths, passes, job)
+
+    def _input_paths(self, paths, from_file=None, stdin=False, nul=False):
+        """Stream the given paths, then any listed in a file or on stdin, minus duplicates"""
+        # Opened up front so a missing list is reported before anything is erased
+        stream = open(from_file, 'rb') if from_file else (sys.stdin.buffer if stdin else None)
+
+        def generate():
+            try:
+                yield from paths
+                if stream is not None:
+                    yield from read_paths(stream, nul)
+            finally:
+                if from_file:
+                    stream.close()
+
+        return unique_paths(generate(), on_skip=self.reporter.message)
+
+    def _plan(self, paths, passes, as_json=False):
+        """Report what erasing the paths would involve, without erasing anything"""
+        self.reporter.notice("\n[→] Scanning for a dry run...")
+        report = Planner(self.overwriter).plan(paths, passes)
+        if as_json:
+            print(json.dumps(report.as_dict()))
         else:
-            passes = self._get_passes_interactively()  # Fixed: assign the return value
+            for line in report.lines():
+                print(line)
+        return report
+
+    def _expect(self, paths, passes, scan_trees=False):
+        """Size the targets up front so the progress display can show an ETA"""
+        # Lists streamed from a file or stdin are never read twice, so they get no ETA,
+        # and neither do directory trees unless --eta pays for a second stat per file
+        if not scan_trees and any(os.path.isdir(path) for path in paths):
+            return
+        report = Planner(self.overwriter).plan(paths, passes, probe=False)
+        self.reporter.expect(report.files, report.io_bytes)
+
+    def _resume_job(self, args):
+        """Pick an interrupted job back up from its manifest"""
+        try:
+            job = JobManifest.resume(args.job_file)
+        except (OSError, ValueError) as e:
+            self.reporter.error(f"[X] Cannot resume job: {e}")
+            return
+        if job.complete:
+            self.reporter.notice(f"[i] Job {args.job_file} has already completed.")
+            job.close()
+            return
+        options = job.plan['options']
+        # Relative paths (typed, or inside the list) and the progress recorded for them
+        # only name the same files from the directory the job was started in
+        cwd = options.get('cwd')
+        relative = options.get('from_file') or not all(os.path.isabs(p) for p in job.plan['paths'])
+        if relative and cwd is not None and os.path.realpath(cwd) != os.path.realpath(os.getcwd()):
+            self.reporter.error(f"[X] Job {args.job_file} was started in {cwd}; "
+                                f"resume it from there, its paths are relative to it")
+            job.close()
+            return
+        # The remaining passes must write, skip holes and verify as the job started out doing
+        restored = [name for name in ('method', 'pattern', 'sparse', 'verify')
+                    if name in options and options[name] != getattr(args, name)]
+        if restored:
+            for name in restored:
+                setattr(args, name, options[name])
+            self.reporter.message(f"[i] Using the job's recorded {', '.join(restored)}")
+            self.overwriter = self._build_overwriter(args)
+        try:
+            paths = self._input_paths(job.plan['paths'], options.get('from_file'), nul=options.get('null', False))
+        except OSError as e:
+            self.reporter.error(f"[X] Cannot read path list: {e}")
+            job.close()
+            return
+        self.reporter.notice(f"[i] Resuming job {args.job_file}")
+        self._run_erasure(paths, job.plan['passes'], job)
 
-        print(f"\nStarting secure erasure with {passes} passes...")
+    def _run_erasure(self, paths, passes, job=None):
+        """Erase each path, recording progress in the job manifest if there is one"""
+        self.overwriter.job = job
+        self.reporter.notice(f"\nStarting secure erasure with {passes} passes...")
         
         # Securely erase each path
         success_count = 0
-        total_count = len(paths)
+        total_count = 0
         
-        for path in paths:
-            if self.overwriter.process_path(path, passes):
-                success_count += 1
+        try:
+            # Paths may be a lazy stream, so they are counted as they are erased
+            for path in paths:
+                total_count += 1
+                if self.overwriter.process_path(path, passes):
+                    success_count += 1
+            # One barrier for the whole list, however many files it named
+            self.overwriter.durability.finish()
+            if job is not None:
+                job.mark_complete()
+        finally:
+            if job is not None:
+                job.close()
         
-        print(f"\nOperation completed: {success_count}/{total_count} paths processed successfully.")
+        self.reporter.summary(success_count, total_count)
 
 
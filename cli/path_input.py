@@ -0,0 +1,54 @@
+import os
+
+
+READ_SIZE = 64 * 1024
+
+
+def read_paths(stream, nul=False):
+    """Yield the paths listed in a binary stream, one at a time.
+
+    Paths are separated by newlines, or by NUL bytes with `nul` (as written
+    by `find -print0`), and decoded the way the OS decodes file names.
+    Only one read block is held at a time, so lists of any length can be
+    consumed while erasure is already under way.
+    """
+    separator = b'\0' if nul else b'\n'
+    pending = b''
+    while True:
+        block = stream.read(READ_SIZE)
+        if not block:
+            break
+        pieces = (pending + block).split(separator)
+        pending = pieces.pop()
+        for piece in pieces:
+            if piece:
+                yield os.fsdecode(piece)
+    if pending:
+        yield os.fsdecode(pending)
+
+
+def unique_paths(paths, on_skip=print):
+    """Drop paths already given, or lying inside a directory already given.
+
+    Paths are compared by their absolute, normalised form as they stream
+    past. A directory listed after something inside it is still erased,
+    since the earlier path has been handled by then.
+    """
+    seen = set()
+    for path in paths:
+        key = os.path.abspath(path)
+        parent = key
+        nested = False
+        while True:
+            if parent in seen:
+                nested = True
+                break
+            next_parent = os.path.dirname(parent)
+            if next_parent == parent:
+                break
+            parent = next_parent
+        if nested:
+            on_skip(f"[i] Skipping duplicate or nested path: {path}")
+            continue
+        seen.add(key)
+        yield path
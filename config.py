@@ -0,0 +1,96 @@
+# Default settings for the secure erase tool
+
+DEFAULT_PASSES = 3
+
+# Overwrite passes are streamed through a single reusable buffer of this
+# size, so memory use stays flat regardless of how large the file is.
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Where overwrite data comes from: 'keystream' (ChaCha20 seeded from
+# os.urandom), 'urandom' (kernel CSPRNG for every chunk), 'zeros' or 'ones'
+DEFAULT_PATTERN = 'keystream'
+
+# Fixed patterns (zeros, ones and the passes of --method schemes) are
+# written from one shared, page-aligned buffer per pattern of about this size
+PATTERN_BUFFER_SIZE = 1024 * 1024
+
+# Directory erasure runs this many files at once with --jobs; spinning disks
+# are capped at ROTATIONAL_DEVICE_JOBS so they are not thrashed by seeks
+DEFAULT_JOBS = 1
+ROTATIONAL_DEVICE_JOBS = 1
+
+# The buffered logger writes its queued rows once this many are waiting,
+# or after this many seconds, whichever comes first
+LOG_FLUSH_ROWS = 1000
+LOG_FLUSH_INTERVAL = 1.0
+
+# When overwritten data is forced to the device: 'pass' (fdatasync after
+# every pass), 'final' (only after the last pass), 'writeback'
+# (sync_file_range per chunk plus per-pass sync) or 'batch' (a syncfs
+# barrier every SYNC_BATCH_FILES files). See erasure/durability.py.
+DEFAULT_DURABILITY = 'pass'
+SYNC_BATCH_FILES = 256
+
+# Resumable jobs record their progress inside a file at most every
+# JOB_CHECKPOINT_BYTES written, and fsync the manifest at most every
+# JOB_CHECKPOINT_INTERVAL seconds
+JOB_CHECKPOINT_BYTES = 64 * 1024 * 1024
+JOB_CHECKPOINT_INTERVAL = 5.0
+
+# --plan scans the targets with this many threads, and measures each
+# device's write throughput by writing PLAN_PROBE_BYTES to a temp file
+PLAN_SCAN_THREADS = 8
+PLAN_PROBE_BYTES = 64 * 1024 * 1024
+
+# --verify sample reads back this many random blocks of VERIFY_BLOCK_SIZE
+# bytes from each file's final pass; --verify full reads back everything
+VERIFY_SAMPLES = 64
+VERIFY_BLOCK_SIZE = 4096
+
+# The progress display is redrawn at most every PROGRESS_INTERVAL seconds
+# on a terminal, and written as a plain line every PROGRESS_LOG_INTERVAL
+# seconds when output goes to a pipe or log collector
+PROGRESS_INTERVAL = 0.25
+PROGRESS_LOG_INTERVAL = 10.0
+
+# --wipe-free-space fills a volume with fill files of up to
+# FREE_SPACE_FILL_SIZE bytes, FREE_SPACE_WORKERS at a time, and stops
+# once only FREE_SPACE_RESERVE bytes are left free
+FREE_SPACE_FILL_SIZE = 1024 * 1024 * 1024
+FREE_SPACE_WORKERS = 4
+FREE_SPACE_RESERVE = 1024 * 1024 * 1024
+
+# The erase daemon (--daemon) erases with DAEMON_WORKERS threads and
+# coalesces queued jobs with the same passes into batches of up to
+# DAEMON_BATCH_PATHS paths; the status of the last DAEMON_KEEP_JOBS
+# finished jobs is kept for clients to query
+DAEMON_WORKERS = 4
+DAEMON_BATCH_PATHS = 256
+DAEMON_KEEP_JOBS = 1000
+
+# --direct writes passes with O_DIRECT from buffers aligned to
+# DIRECT_IO_ALIGNMENT bytes (the largest logical block size in common
+# use), keeping up to DIRECT_IO_DEPTH chunks per file in flight
+DIRECT_IO_ALIGNMENT = 4096
+DIRECT_IO_DEPTH = 4
+
+# With --jobs, directory erasure hands files to the workers in windows of up
+# to SCHEDULE_WINDOW_FILES files, largest first. Held, queued and running
+# files keep their directories open, so at most SCHEDULE_WINDOW_DIRS
+# directories are open for them at once.
+# Files under SMALL_FILE_SIZE go out in batches of up to SMALL_BATCH_FILES
+# files / SMALL_BATCH_BYTES bytes, and each file is costed as its size plus
+# SCHEDULE_FILE_COST bytes for its open, sync and unlink
+SCHEDULE_WINDOW_FILES = 4096
+SCHEDULE_WINDOW_DIRS = 256
+SMALL_FILE_SIZE = 1024 * 1024
+SMALL_BATCH_FILES = 64
+SMALL_BATCH_BYTES = 16 * 1024 * 1024
+SCHEDULE_FILE_COST = 64 * 1024
+
+# Passes over files of at least SPLIT_FILE_SIZE bytes are split into up to
+# SPLIT_RANGES ranges written concurrently (with --jobs, buffered writes)
+SPLIT_FILE_SIZE = 1024 * 1024 * 1024
+SPLIT_RANGES = 4
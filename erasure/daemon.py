@@ -0,0 +1,346 @@
+import heapq
+import itertools
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from erasure.parallel import DevicePool
+from config import DEFAULT_PASSES, DAEMON_WORKERS, DAEMON_BATCH_PATHS, DAEMON_KEEP_JOBS
+
+
+class DaemonJob:
+    """One submitted erase request and what has become of it"""
+
+    def __init__(self, job_id, paths, passes, priority):
+        self.id = job_id
+        self.paths = list(paths)
+        self.passes = passes
+        self.priority = priority
+        self.state = 'queued'
+        self.results = {}
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+        # Results are recorded by the pool threads while status requests read them
+        self._lock = threading.Lock()
+
+    def record(self, path, ok):
+        with self._lock:
+            self.results[path] = ok
+
+    def as_dict(self, results=False):
+        with self._lock:
+            snapshot = dict(self.results)
+        status = {
+            'job': self.id,
+            'state': self.state,
+            'priority': self.priority,
+            'passes': self.passes,
+            'paths': len(self.paths),
+            'completed': len(snapshot),
+            'succeeded': sum(1 for ok in snapshot.values() if ok),
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+        }
+        if results:
+            status['results'] = snapshot
+        return status
+
+
+class EraseDaemon:
+    """Long-running erase service fed through a Unix-domain socket.
+
+    Clients send one JSON object per line and get one JSON object back:
+
+        {"op": "submit", "paths": [...], "passes": 3, "priority": 0}
+        {"op": "status"}                     all jobs, or {"op": "status", "job": 7}
+        {"op": "wait", "job": 7, "timeout": 60}
+        {"op": "shutdown"}
+
+    Jobs run highest priority first, then in submission order. Queued
+    jobs with the same pass count are coalesced into one batch of up to
+    `batch_paths` paths. Every path, and with --jobs every file of a
+    directory tree, runs on one DevicePool of `workers` threads shared
+    by all jobs, so per-device limits (one job on a spinning disk) hold
+    across jobs and the threads keep their preallocated buffers warm.
+    """
+
+    def __init__(self, overwriter, socket_path, passes=DEFAULT_PASSES, workers=DAEMON_WORKERS,
+                 batch_paths=DAEMON_BATCH_PATHS, keep_jobs=DAEMON_KEEP_JOBS):
+        self.overwriter = overwriter
+        self.passes = passes
+        self.reporter = overwriter.reporter
+        self.socket_path = socket_path
+        self.workers = workers
+        self.batch_paths = batch_paths
+        self.keep_jobs = keep_jobs
+        self._jobs = OrderedDict()
+        self._queue = []
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._server = None
+        self._pool = None
+        # Walk directory trees whose files are dispatched to the pool one by one
+        self._walkers = None
+        self._scheduler = None
+
+    # Job queue
+
+    def submit(self, paths, passes=None, priority=0):
+        """Queue a job; passes default to the daemon's own"""
+        if self.overwriter.scheme is not None:
+            passes = self.overwriter.scheme.passes
+        elif passes is None:
+            passes = self.passes
+        if not paths:
+            raise ValueError("a job needs at least one path")
+        if passes < 1:
+            raise ValueError("passes must be at least 1")
+        with self._cond:
+            if self._stopping:
+                raise ValueError("daemon is shutting down")
+            job = DaemonJob(next(self._ids), paths, passes, priority)
+            self._jobs[job.id] = job
+            heapq.heappush(self._queue, (-priority, next(self._order), job))
+            self._prune()
+            self._cond.notify()
+        self.reporter.notice(f"[i] Job {job.id} queued: {len(job.paths)} path(s), priority {priority}")
+        return job
+
+    def job(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"no such job: {job_id}")
+        return job
+
+    def status(self):
+        with self._cond:
+            jobs = list(self._jobs.values())
+            queued = len(self._queue)
+        return {'queued': queued, 'jobs': [job.as_dict() for job in jobs]}
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond keep_jobs (lock held)"""
+        excess = len(self._jobs) - self.keep_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done.is_set()][:excess]:
+            del self._jobs[job_id]
+
+    def _next_batch(self):
+        """Wait for work; return the top job plus queued jobs it can be coalesced with"""
+        with self._cond:
+            while not self._queue and not self._stopping:
+                self._cond.wait()
+            if self._stopping:
+                return []
+            _, _, first = heapq.heappop(self._queue)
+            batch = [first]
+            size = len(first.paths)
+            skipped = []
+            while self._queue and size < self.batch_paths:
+                entry = heapq.heappop(self._queue)
+                job = entry[2]
+                if job.passes == first.passes and size + len(job.paths) <= self.batch_paths:
+                    batch.append(job)
+                    size += len(job.paths)
+                else:
+                    skipped.append(entry)
+            for entry in skipped:
+                heapq.heappush(self._queue, entry)
+            for job in batch:
+                job.state = 'running'
+                job.started = time.time()
+            return batch
+
+    def _run_batch(self, batch):
+        passes = batch[0].passes
+        work = [(job, path) for job in batch for path in job.paths]
+
+        def erase(item):
+            job, path = item
+            try:
+                ok = self.overwriter.process_path(path, passes)
+            except Exception as e:
+                self.reporter.error(f"[X] Unexpected error erasing {path}: {e}")
+                ok = False
+            job.record(path, ok)
+            return ok
+
+        if len(batch) > 1:
+            self.reporter.message(f"[i] Running jobs {', '.join(str(job.id) for job in batch)} "
+                                  f"as one batch of {len(work)} path(s)")
+        futures = []
+        for item in work:
+            try:
+                st = os.stat(item[1])
+            except OSError:
+                # Nothing to write; process_path reports it
+                futures.append(self._walkers.submit(erase, item))
+                continue
+            if stat.S_ISDIR(st.st_mode) and self.overwriter.jobs > 1:
+                # The tree's files are queued on the shared pool by the walk itself
+                futures.append(self._walkers.submit(erase, item))
+            else:
+                futures.append(self._pool.submit(st.st_dev, erase, item))
+        for future in futures:
+            future.result()
+        self.overwriter.durability.finish()
+        for job in batch:
+            job.state = 'done'
+            job.finished = time.time()
+            job.done.set()
+            succeeded = sum(1 for ok in job.results.values() if ok)
+            self.reporter.notice(f"[✓] Job {job.id} finished: {succeeded}/{len(job.paths)} paths erased")
+
+    def _schedule(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self._run_batch(batch)
+
+    # Protocol
+
+    def handle(self, request):
+        """Answer one decoded request"""
+        op = request.get('op')
+        try:
+            if op == 'submit':
+                paths = request.get('paths')
+                if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+                    raise ValueError("paths must be a list of strings")
+                passes = request.get('passes')
+                job = self.submit(paths, None if passes is None else int(passes), int(request.get('priority', 0)))
+                return {'ok': True, 'job': job.id}
+            if op == 'status':
+                if request.get('job') is not None:
+                    return {'ok': True, 'job': self.job(int(request['job'])).as_dict(results=True)}
+                return dict(ok=True, **self.status())
+            if op == 'wait':
+                job = self.job(int(request['job']))
+                finished = job.done.wait(request.get('timeout'))
+                return {'ok': True, 'finished': finished, 'job': job.as_dict(results=True)}
+            if op == 'shutdown':
+                threading.Thread(target=self.shutdown, name='daemon-shutdown').start()
+                return {'ok': True}
+            raise ValueError(f"unknown op: {op}")
+        except (KeyError, ValueError, TypeError) as e:
+            return {'ok': False, 'error': str(e).strip("'")}
+
+    def start(self):
+        """Bind the socket and start serving in background threads"""
+        _remove_stale_socket(self.socket_path)
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError
+                    except ValueError:
+                        response = {'ok': False, 'error': 'requests must be JSON objects, one per line'}
+                    else:
+                        response = daemon.handle(request)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                    self.wfile.flush()
+
+        # Only the daemon's own user may connect: jobs delete files with its rights
+        old_umask = os.umask(0o077)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+        self._pool = DevicePool(self.workers, self.overwriter.jobs_per_device)
+        self.overwriter.device_pool = self._pool
+        self._walkers = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="daemon-walk")
+        self._scheduler = threading.Thread(target=self._schedule, name='daemon-scheduler')
+        self._scheduler.start()
+        threading.Thread(target=self._server.serve_forever, name='daemon-socket', daemon=True).start()
+        self.reporter.notice(f"[→] Erase daemon listening on {self.socket_path} with {self.workers} workers")
+
+    def shutdown(self):
+        """Stop accepting jobs, finish the running batch and cancel what is still queued"""
+        with self._cond:
+            stopping = self._stopping
+            self._stopping = True
+            cancelled = [entry[2] for entry in self._queue]
+            self._queue = []
+            self._cond.notify_all()
+        if stopping:
+            self._stopped.wait()
+            return
+        for job in cancelled:
+            job.state = 'cancelled'
+            job.done.set()
+        if self._scheduler is not None:
+            self._scheduler.join()
+        if self._walkers is not None:
+            self._walkers.shutdown()
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        self.reporter.notice("[i] Erase daemon stopped")
+        self._stopped.set()
+
+    def wait(self):
+        """Block until the daemon has been shut down"""
+        # Short waits, so the main thread still runs signal handlers
+        while not self._stopped.wait(0.5):
+            pass
+
+
+def _remove_stale_socket(path):
+    """Remove a socket file left behind by a daemon that is no longer running"""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    # Never delete whatever else the path was pointed at by mistake
+    if not stat.S_ISSOCK(st.st_mode):
+        raise OSError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    else:
+        raise OSError(f"another daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def request(socket_path, message, timeout=None):
+    """Send one request to a running daemon and return its reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        conn.sendall(json.dumps(message).encode() + b"\n")
+        with conn.makefile('rb') as replies:
+            line = replies.readline()
+    if not line:
+        raise ConnectionError("daemon closed the connection without replying")
+    return json.loads(line)
@@ -0,0 +1,48 @@
+import mmap
+import os
+
+from config import DIRECT_IO_ALIGNMENT
+
+
+# 0 where the platform has no O_DIRECT (e.g. macOS), in which case --direct is refused
+O_DIRECT = getattr(os, 'O_DIRECT', 0)
+
+
+def align_down(offset):
+    return offset - offset % DIRECT_IO_ALIGNMENT
+
+
+def align_up(offset):
+    return -(-offset // DIRECT_IO_ALIGNMENT) * DIRECT_IO_ALIGNMENT
+
+
+class AlignedBuffer:
+    """A page-aligned anonymous mmap that O_DIRECT writes can be made from"""
+
+    def __init__(self, size):
+        self.region = mmap.mmap(-1, align_up(size))
+        self.view = memoryview(self.region)
+
+    def fill(self, source, length, offset):
+        """Fill the first `length` bytes with pattern data for file `offset`; returns a view of them.
+
+        Sources that hand back their own shared data (constant patterns) are
+        copied in, since that data need not start on an aligned address.
+        """
+        view = self.view[:length]
+        filled = 0
+        while filled < length:
+            data = source.chunk(view[filled:], length - filled, offset + filled)
+            if data.obj is not self.region:
+                view[filled:filled + len(data)] = data
+            filled += len(data)
+        return view
+
+
+def pwrite_all(fd, view, offset):
+    """Write all of `view` at `offset`, continuing after short writes"""
+    pwritev = getattr(os, 'pwritev', None)
+    while view:
+        written = pwritev(fd, [view], offset) if pwritev is not None else os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
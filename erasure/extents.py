@@ -0,0 +1,76 @@
+import errno
+import os
+
+
+def full_extent(size):
+    """The whole logical range of a file as a single extent"""
+    return [(0, size)] if size > 0 else []
+
+
+def data_extents(fd, size):
+    """Return the allocated (offset, length) ranges of an open file.
+
+    Uses lseek(SEEK_DATA/SEEK_HOLE), so holes in sparse files are skipped
+    and never get allocated by an overwrite. Filesystems or platforms that
+    cannot report holes are treated as fully allocated.
+    """
+    if not hasattr(os, 'SEEK_DATA'):
+        return full_extent(size)
+
+    extents = []
+    offset = 0
+    try:
+        while offset < size:
+            try:
+                start = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    # No data past offset: the rest of the file is a hole
+                    break
+                raise
+            end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+            if end > start:
+                extents.append((start, end - start))
+            offset = end
+    except OSError as e:
+        if e.errno in (errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP):
+            return full_extent(size)
+        raise
+    finally:
+        os.lseek(fd, 0, os.SEEK_SET)
+    return extents
+
+
+def extents_size(extents):
+    """Total number of bytes covered by a list of extents"""
+    return sum(length for _, length in extents)
+
+
+def split_extents(extents, parts, granularity=1):
+    """Divide extents into up to `parts` contiguous groups of about equal size.
+
+    Every group but the last covers a multiple of `granularity` bytes, so
+    passes over them stream whole chunks.
+    """
+    total = extents_size(extents)
+    if parts <= 1 or total == 0:
+        return [list(extents)] if extents else []
+    share = -(-total // parts)
+    share = -(-share // granularity) * granularity
+    groups = []
+    current = []
+    room = share
+    for start, length in extents:
+        while length > 0:
+            take = min(length, room)
+            current.append((start, take))
+            start += take
+            length -= take
+            room -= take
+            if room == 0:
+                groups.append(current)
+                current = []
+                room = share
+    if current:
+        groups.append(current)
+    return groups
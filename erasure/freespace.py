@@ -0,0 +1,142 @@
+import errno
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from utils.progress import format_bytes
+from erasure.direct import O_DIRECT
+from config import FREE_SPACE_FILL_SIZE, FREE_SPACE_RESERVE, FREE_SPACE_WORKERS
+
+
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+
+def available_bytes(path):
+    """Space this process can still fill on the filesystem holding path.
+
+    Root may also write the blocks the filesystem reserves for it (f_bfree
+    rather than f_bavail), and those can hold deleted data too; other users
+    can neither fill nor wipe them.
+    """
+    st = os.statvfs(path)
+    blocks = st.f_bfree if os.geteuid() == 0 else st.f_bavail
+    return blocks * st.f_frsize
+
+
+class FreeSpaceWiper:
+    """Overwrites the free space of a filesystem with fill files.
+
+    Fill files of up to `fill_size` bytes are preallocated with
+    posix_fallocate and overwritten through the Overwriter's streaming
+    pass loop, `workers` at a time, until the filesystem is full or only
+    `reserve` bytes remain free (counting the root-reserved blocks when
+    run as root, see available_bytes). Every fill file is synced before all of
+    them are removed again, so the blocks that held deleted data have
+    been overwritten on the device.
+    """
+
+    def __init__(self, overwriter, reserve=FREE_SPACE_RESERVE, fill_size=FREE_SPACE_FILL_SIZE,
+                 workers=FREE_SPACE_WORKERS):
+        if fill_size <= 0:
+            raise ValueError("fill_size must be a positive number of bytes")
+        self.overwriter = overwriter
+        self.reporter = overwriter.reporter
+        self.reserve = reserve
+        self.fill_size = fill_size
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._full = threading.Event()
+        self._paths = []
+
+    def wipe(self, mountpoint, passes=3):
+        """Fill, overwrite and release the free space; returns the number of bytes wiped"""
+        if not os.path.isdir(mountpoint):
+            raise NotADirectoryError(f"Not a directory: {mountpoint}")
+        target = available_bytes(mountpoint) - self.reserve
+        if target <= 0:
+            self.reporter.notice(f"[i] Free space on {mountpoint} is already within the reserve; nothing to wipe")
+            return 0
+        self.reporter.notice(f"[→] Wiping free space on {mountpoint} with {passes} passes, "
+                             f"leaving {format_bytes(self.reserve)} free...")
+        self.reporter.expect(0, target * passes)
+
+        fill_dir = tempfile.mkdtemp(dir=mountpoint, prefix='.secure-erase-fill-')
+        self._full.clear()
+        self._paths = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fill") as pool:
+                futures = [pool.submit(self._fill, fill_dir, passes) for _ in range(self.workers)]
+                wiped = sum(future.result() for future in futures)
+        finally:
+            # Releasing the space is not optional, whatever happened while filling
+            shutil.rmtree(fill_dir, ignore_errors=True)
+        self.reporter.notice(f"[✓] Wiped {format_bytes(wiped)} of free space on {mountpoint} "
+                             f"using {len(self._paths)} fill files")
+        return wiped
+
+    def _claim(self, fill_dir):
+        """Create and preallocate the next fill file; None once the reserve is reached"""
+        with self._lock:
+            if self._full.is_set():
+                return None
+            size = min(self.fill_size, available_bytes(fill_dir) - self.reserve)
+            if size <= 0:
+                self._full.set()
+                return None
+            fd, path = tempfile.mkstemp(dir=fill_dir, prefix='fill-')
+            self._paths.append(path)
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except AttributeError:
+                # No posix_fallocate here: the overwrite itself allocates the blocks
+                pass
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    self._full.set()
+                    size = os.fstat(fd).st_size
+                elif e.errno not in (errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP):
+                    os.close(fd)
+                    raise
+            if size <= 0:
+                os.close(fd)
+                return None
+            return fd, path, size
+
+    def _fill(self, fill_dir, passes):
+        """Worker loop: claim fill files and overwrite them until the space is used up"""
+        try:
+            return self._fill_files(fill_dir, passes)
+        except BaseException:
+            # Stop the other workers too; the caller cleans up and re-raises
+            self._full.set()
+            raise
+
+    def _fill_files(self, fill_dir, passes):
+        wiped = 0
+        overwriter = self.overwriter
+        while True:
+            claim = self._claim(fill_dir)
+            if claim is None:
+                return wiped
+            fd, path, size = claim
+            direct = None
+            if overwriter.direct:
+                direct = overwriter._open_direct(lambda: os.open(path, os.O_RDWR | O_DIRECT), path)
+            # Unbuffered, so running out of space surfaces in the write that hit it
+            with open(fd, 'r+b', buffering=0) as f, (direct or nullcontext()):
+                try:
+                    for i in range(passes):
+                        overwriter._write_pass(f, size, source=overwriter._pass_source(i), direct=direct)
+                        f.flush()
+                        overwriter.durability.after_pass(f.fileno(), i, passes)
+                except OSError as e:
+                    if e.errno not in (errno.ENOSPC, errno.EDQUOT):
+                        raise
+                    # Filesystems that cannot preallocate run out part-way through
+                    self._full.set()
+                # The fill must be on the device before the files are removed
+                _fdatasync(f.fileno())
+                wiped += os.fstat(f.fileno()).st_size
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+
+from config import JOB_CHECKPOINT_BYTES, JOB_CHECKPOINT_INTERVAL
+
+
+class JobManifest:
+    """Append-only, JSON-lines record of an erase job and its progress.
+
+    The first record is the plan (the target paths, passes and options).
+    After that the file only grows:
+
+        {"type": "progress", "path": ..., "pass": 1, "offset": 67108864}
+        {"type": "done", "path": ..., "success": true}
+        {"type": "complete"}
+
+    "pass" counts the passes already finished and "offset" is how far the
+    next one got. Replaying the records rebuilds the state, so an
+    interrupted job resumes mid-pass and skips finished files without
+    touching them again. A record torn by a crash is ignored.
+    """
+
+    def __init__(self, path, checkpoint_bytes=JOB_CHECKPOINT_BYTES,
+                 checkpoint_interval=JOB_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.checkpoint_bytes = checkpoint_bytes
+        self.checkpoint_interval = checkpoint_interval
+        self.plan = None
+        self.complete = False
+        self._progress = {}
+        self._done = {}
+        self._last_offset = {}
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        torn = False
+        if os.path.exists(path):
+            torn = self._load()
+        self._file = open(path, mode='a', encoding='utf-8')
+        if torn:
+            # Terminate the torn record so the next one starts on its own line
+            self._file.write("\n")
+
+    @classmethod
+    def create(cls, path, paths, passes, options=None):
+        """Start a new job file recording the plan"""
+        if os.path.exists(path):
+            raise FileExistsError(f"Job file already exists: {path} (use --resume to continue it)")
+        job = cls(path)
+        job.plan = {'paths': list(paths), 'passes': passes, 'options': options or {}}
+        job._append(dict(type='plan', created=time.strftime("%Y-%m-%d %H:%M:%S"), **job.plan), sync=True)
+        return job
+
+    @classmethod
+    def resume(cls, path):
+        """Reopen an existing job file and replay its progress"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Job file not found: {path}")
+        job = cls(path)
+        if job.plan is None:
+            raise ValueError(f"Job file has no plan record: {path}")
+        return job
+
+    def _load(self):
+        """Replay the records; returns True if the last one was torn"""
+        line = ''
+        with open(self.path, mode='r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from an interrupted run
+                    continue
+                kind = record.get('type')
+                if kind == 'plan':
+                    self.plan = {'paths': record['paths'], 'passes': record['passes'],
+                                 'options': record.get('options', {})}
+                elif kind == 'progress':
+                    self._progress[record['path']] = (record['pass'], record['offset'])
+                elif kind == 'done':
+                    self._done[record['path']] = record['success']
+                    self._progress.pop(record['path'], None)
+                elif kind == 'complete':
+                    self.complete = True
+        return bool(line) and not line.endswith("\n")
+
+    def _append(self, record, sync=False):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            now = time.monotonic()
+            if sync or now - self._last_sync >= self.checkpoint_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def is_done(self, path):
+        return path in self._done
+
+    def result(self, path):
+        """Recorded success of a finished path"""
+        return self._done[path]
+
+    def progress_for(self, path):
+        """(completed passes, offset within the next pass) for a path"""
+        return self._progress.get(path, (0, 0))
+
+    def checkpoint(self, path, completed_passes, offset, force=False):
+        """Record progress within a file; cheap calls are skipped unless enough was written"""
+        if not force:
+            last_pass, last_offset = self._last_offset.get(path, (completed_passes, 0))
+            if last_pass == completed_passes and offset - last_offset < self.checkpoint_bytes:
+                return
+        self._last_offset[path] = (completed_passes, offset)
+        self._progress[path] = (completed_passes, offset)
+        self._append({'type': 'progress', 'path': path, 'pass': completed_passes, 'offset': offset})
+
+    def mark_done(self, path, success):
+        self._done[path] = success
+        self._progress.pop(path, None)
+        self._last_offset.pop(path, None)
+        self._append({'type': 'done', 'path': path, 'success': bool(success)})
+
+    def mark_complete(self):
+        self.complete = True
+        self._append({'type': 'complete'}, sync=True)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
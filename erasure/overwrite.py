@@ -1,115 +1,778 @@
+import errno
 import os
+import stat
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from utils.logger import Logger
+from utils.metrics import NullMetrics
+from utils.progress import VerboseReporter
+from erasure.patterns import get_source, RANDOM_SOURCES
+from erasure.schemes import get_scheme
+from erasure.parallel import DevicePool, device_limit, running_pool
+from erasure.durability import get_policy
+from erasure.extents import data_extents, extents_size, full_extent, split_extents
+from erasure.verify import Verifier
+from erasure.direct import O_DIRECT, AlignedBuffer, align_down, pwrite_all
+from erasure.scheduler import SizeScheduler
+from erasure.walker import walk, FileEntry, DirectoryEntry, DirectoryLoop, SkippedEntry, WalkError
+from config import (DEFAULT_CHUNK_SIZE, DEFAULT_PATTERN, DEFAULT_JOBS, DEFAULT_DURABILITY, SYNC_BATCH_FILES,
+                    VERIFY_SAMPLES, DIRECT_IO_DEPTH, DIRECT_IO_ALIGNMENT, SPLIT_FILE_SIZE, SPLIT_RANGES,
+                    SCHEDULE_WINDOW_FILES)
 
 
 class Overwriter:
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, chunk_size=DEFAULT_CHUNK_SIZE, pattern=DEFAULT_PATTERN,
+                 jobs=DEFAULT_JOBS, jobs_per_device=None, durability=DEFAULT_DURABILITY,
+                 sync_every=SYNC_BATCH_FILES, sparse=False, metrics=None, job=None,
+                 verify=None, verify_samples=VERIFY_SAMPLES, method=None, reporter=None, direct=False,
+                 direct_depth=DIRECT_IO_DEPTH, split_size=SPLIT_FILE_SIZE, split_ranges=SPLIT_RANGES,
+                 schedule_window=SCHEDULE_WINDOW_FILES):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive number of bytes")
         self.logger = logger or Logger()
+        self.chunk_size = chunk_size
+        self.pattern = pattern
+        self.jobs = jobs
+        self.jobs_per_device = jobs_per_device
+        self.durability = get_policy(durability, sync_every)
+        # Only overwrite the allocated extents of sparse files, never the holes
+        self.sparse = sparse
+        self.metrics = metrics or NullMetrics()
+        # Where progress, warnings and per-file results are shown
+        self.reporter = reporter or VerboseReporter()
+        # Optional JobManifest recording per-file progress so a run can resume
+        self.job = job
+        # A named method (see erasure/schemes.py) fixes the number of passes
+        # and what each one writes; its random passes use `pattern`
+        self.scheme = get_scheme(method) if method else None
+        if self.scheme is not None and self.scheme.uses_random and pattern not in RANDOM_SOURCES:
+            raise ValueError(f"--method {method} needs a random pattern source, not '{pattern}'")
+        # Optional read-back check of the final pass: 'full' or 'sample'
+        verify = verify or (self.scheme.verify if self.scheme is not None else None)
+        self.verifier = Verifier(verify, verify_samples) if verify else None
+        # Write passes with O_DIRECT, keeping up to direct_depth writes per file in flight
+        if direct and not O_DIRECT:
+            raise ValueError("direct I/O (O_DIRECT) is not available on this platform")
+        if direct and chunk_size % DIRECT_IO_ALIGNMENT:
+            # Every chunk after the first would start at an unaligned offset (EINVAL)
+            raise ValueError(f"direct I/O needs a chunk size that is a multiple of {DIRECT_IO_ALIGNMENT} bytes")
+        self.direct = direct
+        self.direct_depth = direct_depth
+        self._direct_pool = None
+        self._pool_lock = threading.Lock()
+        self._direct_warned = False
+        # With --jobs, directory files are ordered largest first within windows
+        # of schedule_window files (1 keeps walk order), and passes over files
+        # of split_size bytes or more are written as up to split_ranges ranges
+        self.schedule_window = schedule_window
+        self.split_size = split_size
+        self.split_ranges = split_ranges
+        self._range_pool = None
+        # A DevicePool shared with other callers (the daemon's) that tree files run on,
+        # so per-device limits hold across them; by default each tree gets its own
+        self.device_pool = None
+        # Each thread streams its passes through its own preallocated buffer
+        # and pattern source; this also validates the pattern name up front
+        self._local = threading.local()
+        self._thread_state()
 
+    def _thread_state(self):
+        """Return the (buffer, source) pair owned by the calling thread"""
+        local = self._local
+        if not hasattr(local, 'buffer'):
+            local.source = get_source(self.pattern)
+            local.buffer = bytearray(self.chunk_size)
+        return local.buffer, local.source
+
+    def _direct_buffers(self):
+        """The calling thread's ring of aligned buffers, one per write in flight"""
+        local = self._local
+        if not hasattr(local, 'direct_buffers'):
+            local.direct_buffers = [AlignedBuffer(self.chunk_size) for _ in range(self.direct_depth)]
+        return local.direct_buffers
+
+    def _direct_writers(self):
+        """Thread pool running the positional writes of every file being erased"""
+        with self._pool_lock:
+            if self._direct_pool is None:
+                self._direct_pool = ThreadPoolExecutor(max_workers=self.direct_depth * max(self.jobs, 1),
+                                                       thread_name_prefix="pwrite")
+            return self._direct_pool
+
+    def _open_direct(self, opener, path):
+        """A second, O_DIRECT handle for writing the passes, or None to go through the page cache"""
+        try:
+            fd = opener()
+        except OSError as e:
+            # tmpfs and some network filesystems refuse O_DIRECT at open time
+            if e.errno != errno.EINVAL:
+                raise
+            with self._pool_lock:
+                warn, self._direct_warned = not self._direct_warned, True
+            if warn:
+                self.reporter.warning(f"[!] Direct I/O is not supported for {path}; "
+                                      f"writing through the page cache instead")
+            return None
+        return open(fd, 'r+b', buffering=0)
+
+    def _pass_source(self, pass_index):
+        """The scheme's shared fixed-pattern source for a pass, or None for the thread's own"""
+        if self.scheme is None:
+            return None
+        return self.scheme.source(pass_index)
+
+    def _write_pass(self, f, file_size, extents=None, start_offset=0, on_progress=None, observer=None,
+                    source=None, direct=None):
+        """Stream one pass of pattern data over the file in fixed-size chunks.
+
+        `extents` limits the pass to those (offset, length) ranges; by
+        default the whole logical size is overwritten. Data before
+        `start_offset` is skipped (used when resuming a pass), and
+        `on_progress` is called with the file offset after every chunk.
+        `observer(offset, data)` sees every chunk written (for verification).
+        `source` overrides the thread's pattern source for this pass.
+        `direct`, an O_DIRECT handle to the same file, is written instead of f.
+        """
+        buffer, thread_source = self._thread_state()
+        source = source or thread_source
+        if extents is None:
+            extents = full_extent(file_size)
+        if direct is not None:
+            return self._write_pass_direct(direct.fileno(), f.fileno(), extents, start_offset,
+                                           on_progress, observer, source)
+        chunk_hook = self.durability.wants_chunks
+        advance = self.reporter.advance if self.reporter.wants_progress else None
+        clock = time.perf_counter
+        generate_time = write_time = sync_time = 0.0
+        chunks = 0
+        for start, extent_length in extents:
+            end = start + extent_length
+            if end <= start_offset:
+                continue
+            start = max(start, start_offset)
+            f.seek(start)
+            offset = start
+            while offset < end:
+                t0 = clock()
+                data = source.chunk(buffer, min(end - offset, self.chunk_size), offset)
+                length = len(data)
+                t1 = clock()
+                f.write(data)
+                t2 = clock()
+                if observer is not None:
+                    observer(offset, data)
+                generate_time += t1 - t0
+                write_time += t2 - t1
+                if chunk_hook:
+                    f.flush()
+                    self.durability.after_chunk(f.fileno(), offset, length)
+                    sync_time += clock() - t2
+                offset += length
+                chunks += 1
+                if on_progress is not None:
+                    on_progress(offset)
+                if advance is not None:
+                    advance(length)
+
+        # Timings are summed per pass so the per-chunk cost stays two clock reads
+        self.metrics.add('generate', generate_time, chunks)
+        self.metrics.add('write', write_time, chunks)
+        if chunk_hook:
+            self.metrics.add('sync', sync_time, chunks)
+        self.metrics.increment('bytes_written', extents_size(extents))
+
+    def _write_pass_direct(self, fd, tail_fd, extents, start_offset, on_progress, observer, source):
+        """One pass written with O_DIRECT from aligned buffers, several chunks in flight.
+
+        Chunks are generated in order on the calling thread and handed to
+        the positional writer pool, reusing each buffer once its write has
+        completed. A resumed pass restarts at the block boundary before its
+        offset. An extent that ends mid-block (the end of the file) has its
+        last partial block written through `tail_fd`, the ordinary buffered
+        descriptor, so the file never grows; the durability policy's sync
+        after the pass covers it. Nothing else goes through the page cache,
+        so the policy's per-chunk writeback has nothing to do.
+        """
+        buffers = self._direct_buffers()
+        # A pass that fits in one chunk has nothing to overlap, so skip the hand-off
+        writers = self._direct_writers() if extents_size(extents) > self.chunk_size else None
+        advance = self.reporter.advance if self.reporter.wants_progress else None
+        clock = time.perf_counter
+        generate_time = write_time = 0.0
+        chunks = 0
+        # (future, or None if written inline; end of the overwritten range; bytes of it) in order
+        in_flight = deque()
+
+        def complete():
+            future, end, length = in_flight.popleft()
+            if future is not None:
+                future.result()
+            if on_progress is not None:
+                on_progress(end)
+            if advance is not None:
+                advance(length)
+
+        try:
+            for start, extent_length in extents:
+                end = start + extent_length
+                if end <= start_offset:
+                    continue
+                start = max(start, start_offset)
+                offset = align_down(start)
+                while offset < end:
+                    t0 = clock()
+                    if len(in_flight) == len(buffers):
+                        complete()
+                    t1 = clock()
+                    length = min(end - offset, self.chunk_size)
+                    data = buffers[chunks % len(buffers)].fill(source, length, offset)
+                    t2 = clock()
+                    if observer is not None:
+                        lo = max(start, offset)
+                        observer(lo, data[lo - offset:])
+                    aligned = align_down(length)
+                    if aligned < length:
+                        pwrite_all(tail_fd, data[aligned:], offset + aligned)
+                    if writers is None or not aligned:
+                        pwrite_all(fd, data[:aligned], offset)
+                        in_flight.append((None, offset + length, length))
+                    else:
+                        in_flight.append((writers.submit(pwrite_all, fd, data[:aligned], offset),
+                                          offset + length, length))
+                    write_time += t1 - t0 + clock() - t2
+                    generate_time += t2 - t1
+                    offset += length
+                    chunks += 1
+            t0 = clock()
+            while in_flight:
+                complete()
+            write_time += clock() - t0
+        finally:
+            # Never leave writes running into a file the caller is about to close
+            for future, _, _ in in_flight:
+                if future is not None:
+                    future.exception()
+
+        self.metrics.add('generate', generate_time, chunks)
+        self.metrics.add('write', write_time, chunks)
+        self.metrics.increment('bytes_written', extents_size(extents))
+
+    def _pass_ranges(self, extents, st_dev, direct=None):
+        """Extents split for concurrent writing when a file is large enough, else None"""
+        # Resumable jobs checkpoint one offset per pass, and O_DIRECT already
+        # keeps several writes in flight, so neither is split
+        if self.jobs < 2 or self.job is not None or direct is not None:
+            return None
+        if extents_size(extents) < self.split_size:
+            return None
+        # Never more writers than the device takes: a spinning disk would only seek between them
+        if self.device_pool is not None:
+            limit = self.device_pool.device_limit(st_dev)
+        else:
+            limit = device_limit(st_dev, self.jobs, self.jobs_per_device)
+        if limit < 2:
+            return None
+        return split_extents(extents, min(self.split_ranges, limit), self.chunk_size)
+
+    def _range_writers(self):
+        """Thread pool writing the ranges of split passes"""
+        with self._pool_lock:
+            if self._range_pool is None:
+                self._range_pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="range")
+            return self._range_pool
+
+    def _write_ranges(self, entry, file_size, ranges, source):
+        """Write one pass as concurrent range writers, each through its own descriptor.
+
+        On a DevicePool worker the extra writers take free slots of the
+        file's device, so they count against the per-device limit; ranges
+        left without a writer are written by the calling thread.
+        """
+        def write_ranges(parts):
+            for range_extents in parts:
+                with open(entry.open(), 'r+b') as part:
+                    self._write_pass(part, file_size, range_extents, source=source)
+
+        pool = running_pool()
+        st_dev = entry.stat.st_dev
+        extra = len(ranges) - 1 if pool is None else pool.borrow(st_dev, len(ranges) - 1)
+        groups = [ranges[i::extra + 1] for i in range(extra + 1)]
+        futures = []
+        try:
+            writers = self._range_writers()
+            futures = [writers.submit(write_ranges, group) for group in groups[1:]]
+            write_ranges(groups[0])
+        finally:
+            for future in futures:
+                future.exception()
+            if pool is not None:
+                pool.give_back(st_dev, extra)
+        for future in futures:
+            future.result()
+
+    def _resume_point(self, file_path, passes):
+        """(first pass to run, offset within it) for a file, from the job manifest"""
+        if self.job is None:
+            return 0, 0
+        completed, offset = self.job.progress_for(file_path)
+        if completed or offset:
+            self.reporter.message(f"[i] Resuming {file_path} at pass {min(completed + 1, passes)}/{passes}, "
+                                  f"offset {offset}")
+        return min(completed, passes), offset
+
+    def _checkpointer(self, file_path, pass_index):
+        """Progress callback recording cheap in-pass checkpoints to the job manifest"""
+        if self.job is None:
+            return None
+        return lambda offset: self.job.checkpoint(file_path, pass_index, offset)
+
+    def _log(self, file_path, passes, success, **details):
+        """Write the audit record for one file, timed as the 'log' phase"""
+        start = time.perf_counter()
+        self.logger.log(file_path, passes, success=success, **details)
+        self.metrics.add('log', time.perf_counter() - start)
+        self.metrics.increment('files_erased' if success else 'files_failed')
+        self.reporter.file_done(file_path, success, passes, **details)
+        if self.job is not None:
+            self.job.mark_done(file_path, success)
 
     def overwrite_and_delete(self, file_path, passes=3):
         """Securely overwrite and delete a single file"""
-        
-        # Validate the file path
-        if not os.path.exists(file_path):
-            print(f"[!] File does not exist: {file_path}")
-            self.logger.log(file_path, passes, success=False)
-            return False
+        if self.scheme is not None:
+            passes = self.scheme.passes
 
-        if not os.path.isfile(file_path):
-            print(f"[!] Skipping (not a file): {file_path}")
-            self.logger.log(file_path, passes, success=False)
+        # Validate the file path with a single stat
+        try:
+            entry = FileEntry.from_path(file_path)
+        except OSError:
+            self.reporter.warning(f"[!] File does not exist: {file_path}")
+            self._log(file_path, passes, success=False)
             return False
 
+        return self._erase_entry(entry, passes)
+
+    def _erase_entry(self, entry, passes, on_missing=None):
+        """Overwrite and delete a file using the stat result cached in its entry.
+
+        `on_missing`, if given, handles a file that has vanished since it
+        was stat'ed; its result is returned unless it is None.
+        """
+        file_path = entry.path
+        file_size = entry.size
+
+        if not entry.is_file:
+            self.reporter.warning(f"[!] Skipping (not a file): {file_path}")
+            self._log(file_path, passes, success=False, file_size=file_size)
+            return False
 
         try:
-            file_size = os.path.getsize(file_path)
-            
             # Handle empty files
             if file_size == 0:
-                print(f"[i] File is empty, just deleting: {file_path}")
-                os.remove(file_path)
-                print(f"[✓] Deleted empty file: {file_path}")
-                self.logger.log(file_path, passes, success=True)
+                self.reporter.message(f"[i] File is empty, just deleting: {file_path}")
+                with self.metrics.phase('unlink'):
+                    entry.unlink()
+                self.reporter.message(f"[✓] Deleted empty file: {file_path}")
+                self._log(file_path, passes, success=True, file_size=0, bytes_overwritten=0)
                 return True
 
-            print(f"[→] Overwriting {file_path} ({file_size} bytes) with {passes} passes...")
+            with self.metrics.phase('open'):
+                try:
+                    fd = entry.open()
+                except FileNotFoundError:
+                    result = on_missing() if on_missing is not None else None
+                    if result is None:
+                        raise
+                    return result
+                direct = self._open_direct(lambda: entry.open(direct=True), file_path) if self.direct else None
+            with open(fd, 'r+b') as f, (direct or nullcontext()):
+                if self.sparse:
+                    extents = data_extents(f.fileno(), file_size)
+                else:
+                    extents = full_extent(file_size)
+                bytes_overwritten = extents_size(extents)
 
-            with open(file_path, 'r+b') as f:
-                for i in range(passes):
-                    f.seek(0)
-                    # Write random data
-                    random_data = os.urandom(file_size)
-                    f.write(random_data)
-                    f.flush()
-                    os.fsync(f.fileno())  # Force write to disk
-                    print(f"  → Pass {i+1}/{passes} complete")
+                if bytes_overwritten < file_size:
+                    self.reporter.message(f"[→] Overwriting {file_path} ({bytes_overwritten} of {file_size} "
+                                          f"bytes allocated) with {passes} passes...")
+                else:
+                    self.reporter.message(f"[→] Overwriting {file_path} ({file_size} bytes) with {passes} passes...")
+
+                first_pass, resume_offset = self._resume_point(file_path, passes)
+                ranges = self._pass_ranges(extents, entry.stat.st_dev, direct)
+                verify_state = None
+                for i in range(first_pass, passes):
+                    start_offset = resume_offset if i == first_pass else 0
+                    if self.verifier is not None and i == passes - 1:
+                        verify_state = self.verifier.start(extents, start_offset)
+                    if ranges and verify_state is None:
+                        self._write_ranges(entry, file_size, ranges, self._pass_source(i))
+                    else:
+                        self._write_pass(f, file_size, extents,
+                                         start_offset=start_offset,
+                                         on_progress=self._checkpointer(file_path, i),
+                                         observer=verify_state.observe if verify_state is not None else None,
+                                         source=self._pass_source(i), direct=direct)
+                    # Force the pass to disk as the durability policy requires
+                    with self.metrics.phase('sync'):
+                        f.flush()
+                        self.durability.after_pass(f.fileno(), i, passes)
+                    if self.job is not None and i + 1 < passes:
+                        self.job.checkpoint(file_path, i + 1, 0, force=True)
+                verification = {}
+                if verify_state is not None:
+                    with self.metrics.phase('verify'):
+                        verified, bytes_verified = self.verifier.check(f.fileno(), verify_state,
+                                                                       self._thread_state()[0])
+                    self.metrics.increment('bytes_verified', bytes_verified)
+                    if not verified:
+                        # Keep the file so the erase can be retried
+                        self.reporter.error(f"[X] Verification failed, final pass did not read back: {file_path}")
+                        self._log(file_path, passes, success=False, file_size=file_size,
+                                  bytes_overwritten=bytes_overwritten, verified=False,
+                                  bytes_verified=bytes_verified)
+                        return False
+                    self.reporter.message(f"  → Verified {bytes_verified} bytes of the final pass")
+                    verification = {'verified': True, 'bytes_verified': bytes_verified}
+                with self.metrics.phase('sync'):
+                    self.durability.after_file(f.fileno())
 
             # Final step: remove the file
-            os.remove(file_path)
-            print(f"[✓] Securely erased: {file_path}")
-            self.logger.log(file_path, passes, success=True)
+            with self.metrics.phase('unlink'):
+                entry.unlink()
+            self.reporter.message(f"[✓] Securely erased: {file_path}")
+            self._log(file_path, passes, success=True, file_size=file_size,
+                      bytes_overwritten=bytes_overwritten, **verification)
             return True
 
         except PermissionError:
-            print(f"[X] Permission denied: {file_path}")
-            self.logger.log(file_path, passes, success=False)
+            self.reporter.error(f"[X] Permission denied: {file_path}")
+            self._log(file_path, passes, success=False, file_size=file_size)
             return False
         except OSError as e:
-            print(f"[X] OS error erasing {file_path}: {e}")
-            self.logger.log(file_path, passes, success=False)
+            self.reporter.error(f"[X] OS error erasing {file_path}: {e}")
+            self._log(file_path, passes, success=False, file_size=file_size)
             return False
         except Exception as e:
-            print(f"[X] Unexpected error erasing {file_path}: {e}")
-            self.logger.log(file_path, passes, success=False)
+            self.reporter.error(f"[X] Unexpected error erasing {file_path}: {e}")
+            self._log(file_path, passes, success=False, file_size=file_size)
+            return False
+
+    def _skip_predicate(self):
+        """Walker callback skipping files the job has already finished"""
+        return self.job.is_done if self.job is not None else None
+
+    def _erase_item(self, item, passes, root=None, erased_as=None):
+        """Erase one file yielded by the walker under root, then release it.
+
+        `erased_as` looks up the data erased so far in this run, for
+        symlinks whose target is gone (see _unlink_dangling_link).
+        """
+        try:
+            if isinstance(item, SkippedEntry):
+                # Finished by an earlier run of this job
+                return self.job.result(item.path)
+            if isinstance(item, WalkError):
+                if root is not None:
+                    result = self._unlink_dangling_link(item, root, passes, erased_as)
+                    if result is not None:
+                        return result
+                self.reporter.warning(f"[!] File does not exist: {item.path}")
+                self._log(item.path, passes, success=False)
+                return False
+            on_missing = None
+            if root is not None and item.follow_symlinks:
+                # With --jobs the link's target may have been erased through its own path
+                # after the walk stat'ed it through the link
+                on_missing = lambda: self._unlink_dangling_link(item, root, passes, erased_as)
+            return self._erase_entry(item, passes, on_missing=on_missing)
+        finally:
+            item.release()
+
+    def _remove_directory(self, dir_path, entry=None):
+        """Remove a directory once everything inside it has been erased"""
+        try:
+            if entry is not None:
+                entry.rmdir()
+            else:
+                os.rmdir(dir_path)
+            self.reporter.message(f"[✓] Removed empty directory: {dir_path}")
+        except OSError:
+            self.reporter.warning(f"[!] Could not remove directory (not empty?): {dir_path}")
+
+    def _inode_key(self, entry):
+        """(st_dev, st_ino) identifying the data a walked regular file points at, else None"""
+        if not isinstance(entry, FileEntry) or not entry.is_file:
+            return None
+        return entry.stat.st_dev, entry.stat.st_ino
+
+    def _may_have_aliases(self, entry):
+        """Whether other paths in the tree may reach the same data as entry"""
+        # A hard link shares its inode; a followed symlink may point at another file in the tree
+        return entry.stat.st_nlink > 1 or entry.follow_symlinks
+
+    def _unlink_dangling_link(self, item, root, passes, erased_as=None):
+        """Remove a symlink into the tree whose target is already gone; None if it points elsewhere.
+
+        The link is only logged as an alias if erased_as(key, target relative
+        to root) names the path its target's data was erased through in this
+        run; otherwise it is an ordinary broken link.
+        """
+        target = os.path.realpath(item.path)
+        real_root = os.path.realpath(root)
+        if not os.path.islink(item.path) or os.path.commonpath([real_root, target]) != real_root:
+            return None
+        primary_path = None
+        if erased_as is not None:
+            primary_path = erased_as(self._inode_key(item), os.path.relpath(target, real_root))
+        alias = {} if primary_path is None else {'alias_of': primary_path}
+        try:
+            os.unlink(item.path)
+        except OSError as e:
+            self.reporter.error(f"[X] OS error unlinking {item.path}: {e}")
+            self._log(item.path, passes, success=False, **alias)
             return False
+        if primary_path is None:
+            self.reporter.message(f"[✓] Unlinked broken link {item.path} (target {target} does not exist)")
+        else:
+            self.reporter.message(f"[✓] Unlinked {item.path} (link to {primary_path}, already erased)")
+        self._log(item.path, passes, success=True, file_size=0, bytes_overwritten=0, **alias)
+        return True
+
+    def _unlink_alias(self, entry, primary_path, primary_ok, passes):
+        """Remove another link to a file whose data was overwritten through primary_path"""
+        file_path = entry.path
+        try:
+            if not primary_ok:
+                self.reporter.error(f"[X] Keeping {file_path}: it shares its data with {primary_path}, "
+                                    f"which could not be erased")
+                self._log(file_path, passes, success=False, file_size=entry.size, alias_of=primary_path)
+                return False
+            with self.metrics.phase('unlink'):
+                entry.unlink()
+            self.metrics.increment('aliases_unlinked')
+            self.reporter.message(f"[✓] Unlinked {file_path} (same file as {primary_path}, already overwritten)")
+            # The data was counted once, under primary_path; the audit totals sum file_size
+            self._log(file_path, passes, success=True, file_size=0, bytes_overwritten=0, alias_of=primary_path)
+            return True
+        except OSError as e:
+            self.reporter.error(f"[X] OS error unlinking {file_path}: {e}")
+            self._log(file_path, passes, success=False, file_size=entry.size, alias_of=primary_path)
+            return False
+        finally:
+            entry.release()
+
+    def _skip_loop(self, item):
+        self.reporter.warning(f"[!] Not descending into {item.path}: it is the same directory as "
+                              f"{item.first_path} (bind mount or mount loop)")
+
+    def _erase_tree(self, path, passes):
+        """Erase every file under path one after another"""
+        success_count = 0
+        total_count = 0
+        # Inodes reachable by more than one path: (st_dev, st_ino) -> (first path, erased?)
+        erased_inodes = {}
+        # The first paths of those that were erased, relative to path -> first path
+        erased_paths = {}
+
+        def erased_as(key, target):
+            first_path, ok = erased_inodes.get(key, (None, False))
+            return first_path if ok else erased_paths.get(target)
+
+        for item in walk(path, skip=self._skip_predicate()):
+            if isinstance(item, DirectoryEntry):
+                # Everything beneath it has already been handled
+                try:
+                    self._remove_directory(item.path, item)
+                finally:
+                    item.release()
+                continue
+            if isinstance(item, DirectoryLoop):
+                self._skip_loop(item)
+                continue
+
+            total_count += 1
+            key = self._inode_key(item)
+            if key in erased_inodes:
+                result = self._unlink_alias(item, *erased_inodes[key], passes)
+            else:
+                shared = key is not None and self._may_have_aliases(item)
+                item_path = item.path
+                result = self._erase_item(item, passes, root=path, erased_as=erased_as)
+                if shared:
+                    erased_inodes[key] = (item_path, result)
+                    if result:
+                        erased_paths[os.path.relpath(item_path, path)] = item_path
+            if result:
+                success_count += 1
+        return success_count, total_count
+
+    def _erase_tree_parallel(self, path, passes):
+        """Erase every file under path on a per-device worker pool, largest files first"""
+        # 'running' counts this tree's units still queued or running (a shared pool runs others' too)
+        counts = {'success': 0, 'total': 0, 'running': 0}
+        lock = threading.Lock()
+        idle = threading.Condition(lock)
+        pending_dirs = []
+        # Inodes reachable by more than one path: (st_dev, st_ino) -> first path
+        erasing_inodes = {}
+        # Whether each such first path was erased, filled in by the workers
+        outcomes = {}
+        # The first paths that were erased, relative to path -> first path
+        erased_paths = {}
+        # Other links waiting for their first path's outcome: first path -> entries
+        waiting_aliases = {}
+
+        def erased_as(key, target):
+            with lock:
+                first_path = erasing_inodes.get(key)
+                return first_path if outcomes.get(first_path) else erased_paths.get(target)
+
+        def erase_unit(unit):
+            succeeded = 0
+            for entry, shared in unit.items:
+                entry_path, dir_fd = entry.path, entry.dir_fd
+                try:
+                    ok = self._erase_item(entry, passes, root=path, erased_as=erased_as)
+                finally:
+                    # Only once the entry has let go of its directory
+                    scheduler.done(dir_fd)
+                succeeded += bool(ok)
+                if shared:
+                    with lock:
+                        outcomes[entry_path] = ok
+                        if ok:
+                            erased_paths[os.path.relpath(entry_path, path)] = entry_path
+                        aliases = waiting_aliases.pop(entry_path, ())
+                    for alias in aliases:
+                        succeeded += self._unlink_alias(alias, entry_path, ok, passes)
+            return succeeded
+
+        def record(future):
+            with idle:
+                if future.exception() is None:
+                    counts['success'] += future.result()
+                counts['running'] -= 1
+                idle.notify_all()
+
+        def dispatch(units):
+            for unit in units:
+                with lock:
+                    counts['running'] += 1
+                pool.submit(unit.st_dev, erase_unit, unit).add_done_callback(record)
+
+        scheduler = SizeScheduler(window=self.schedule_window)
+        pool = self.device_pool or DevicePool(self.jobs, self.jobs_per_device)
+        try:
+            for item in walk(path, skip=self._skip_predicate()):
+                if isinstance(item, DirectoryEntry):
+                    pending_dirs.append(item.path)
+                    item.release()
+                    continue
+                if isinstance(item, DirectoryLoop):
+                    self._skip_loop(item)
+                    continue
+
+                counts['total'] += 1
+                if not isinstance(item, FileEntry):
+                    if self._erase_item(item, passes, root=path, erased_as=erased_as):
+                        with lock:
+                            counts['success'] += 1
+                    continue
+                key = self._inode_key(item)
+                if key in erasing_inodes:
+                    primary_path = erasing_inodes[key]
+                    with lock:
+                        if primary_path not in outcomes:
+                            # Unlinked by path by the worker that erases the first link, so
+                            # waiting holds no directory descriptor
+                            waiting_aliases.setdefault(primary_path, []).append(
+                                FileEntry(item.path, item.path, item.stat))
+                            item.release()
+                            continue
+                    if self._unlink_alias(item, primary_path, outcomes[primary_path], passes):
+                        with lock:
+                            counts['success'] += 1
+                    continue
+                shared = key is not None and self._may_have_aliases(item)
+                if shared:
+                    erasing_inodes[key] = item.path
+                dispatch(scheduler.add(item, shared))
+                scheduler.wait_for_room()
+            dispatch(scheduler.drain())
+        finally:
+            with idle:
+                idle.wait_for(lambda: not counts['running'])
+            if pool is not self.device_pool:
+                pool.shutdown()
+
+        # Only left if the first link's unit failed outright
+        for primary_path, aliases in waiting_aliases.items():
+            for alias in aliases:
+                counts['success'] += self._unlink_alias(alias, primary_path, False, passes)
+
+        # Every file has finished once no unit is running; the walker lists
+        # subdirectories after their contents, so removal order is bottom-up
+        for dir_path in pending_dirs:
+            self._remove_directory(dir_path)
+        return counts['success'], counts['total']
 
     def process_path(self, path, passes=3):
-        """Process a file or all files in a folder."""
-        if not os.path.exists(path):
-            print(f"[!] Path does not exist: {path}")
+        """Process a file or all files in a folder.
+
+        A directory ends with the durability policy's final barrier; after
+        single files the caller runs durability.finish() once, at the end
+        of the whole list, so batched syncs span files.
+        """
+        if self.scheme is not None:
+            passes = self.scheme.passes
+        if self.job is not None and self.job.is_done(path):
+            self.reporter.message(f"[i] Already completed by this job: {path}")
+            return self.job.result(path)
+
+        result = self._process_path(path, passes)
+        if self.job is not None:
+            self.job.mark_done(path, result)
+        return result
+
+    def _process_path(self, path, passes):
+        try:
+            entry = FileEntry.from_path(path)
+        except OSError:
+            self.reporter.warning(f"[!] Path does not exist: {path}")
             return False
 
-        if os.path.isfile(path):
-            return self.overwrite_and_delete(path, passes)
+        if entry.is_file:
+            return self._erase_entry(entry, passes)
+
+        elif stat.S_ISDIR(entry.stat.st_mode):
+            self.reporter.message(f"[→] Processing directory: {path}")
 
-        elif os.path.isdir(path):
-            print(f"[→] Processing directory: {path}")
-            success_count = 0
-            total_count = 0
-            
             try:
-                for root, dirs, files in os.walk(path, topdown=False):
-                    # Process files first
-                    for name in files:
-                        file_path = os.path.join(root, name)
-                        total_count += 1
-                        if self.overwrite_and_delete(file_path, passes):
-                            success_count += 1
-                    
-                    # Then try to remove empty directories
-                    for name in dirs:
-                        dir_path = os.path.join(root, name)
-                        try:
-                            os.rmdir(dir_path)
-                            print(f"[✓] Removed empty directory: {dir_path}")
-                        except OSError:
-                            print(f"[!] Could not remove directory (not empty?): {dir_path}")
-                
+                try:
+                    if self.jobs > 1:
+                        success_count, total_count = self._erase_tree_parallel(path, passes)
+                    else:
+                        success_count, total_count = self._erase_tree(path, passes)
+                finally:
+                    self.durability.finish()
+
                 # Finally, try to remove the root directory
                 try:
                     os.rmdir(path)
-                    print(f"[✓] Removed directory: {path}")
+                    self.reporter.message(f"[✓] Removed directory: {path}")
                 except OSError:
-                    print(f"[!] Could not remove root directory: {path}")
+                    self.reporter.warning(f"[!] Could not remove root directory: {path}")
                 
-                print(f"[i] Directory processing complete: {success_count}/{total_count} files processed")
+                self.reporter.message(f"[i] Directory processing complete: "
+                                      f"{success_count}/{total_count} files processed")
                 return success_count == total_count
                 
             except Exception as e:
-                print(f"[X] Error processing directory {path}: {e}")
+                self.reporter.error(f"[X] Error processing directory {path}: {e}")
                 return False
         else:
-            print(f"[!] Invalid path (not a file or directory): {path}")
+            self.reporter.warning(f"[!] Invalid path (not a file or directory): {path}")
             return False
-
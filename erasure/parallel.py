@@ -0,0 +1,122 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import ROTATIONAL_DEVICE_JOBS
+
+
+# The DevicePool whose task the current thread is running, if any
+_worker = threading.local()
+
+
+def is_rotational(st_dev):
+    """Best-effort check (Linux sysfs) whether a device number is a spinning disk"""
+    sys_dir = f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}"
+    # Partitions have no queue/ of their own; it lives on the parent disk
+    for queue_dir in (sys_dir, os.path.join(sys_dir, '..')):
+        try:
+            with open(os.path.join(queue_dir, 'queue', 'rotational')) as f:
+                return f.read().strip() == '1'
+        except OSError:
+            continue
+    return False
+
+
+def device_limit(st_dev, jobs, per_device=None):
+    """Maximum number of concurrent writers allowed on one device"""
+    if per_device is not None:
+        return max(1, min(per_device, jobs))
+    if is_rotational(st_dev):
+        return min(ROTATIONAL_DEVICE_JOBS, jobs)
+    return jobs
+
+
+def running_pool():
+    """The DevicePool running the calling thread's current task, or None"""
+    return getattr(_worker, 'pool', None)
+
+
+class DevicePool:
+    """Runs tasks on one executor per block device, under a global job limit.
+
+    Each device (grouped by st_dev) gets its own worker threads, so a slow
+    spinning disk only ever holds its own small share of the pool while
+    SSDs keep all `jobs` slots busy. A running task may borrow more of
+    its device's slots for helper threads (see borrow()).
+    """
+
+    def __init__(self, jobs, per_device=None):
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+        self.jobs = jobs
+        self.per_device = per_device
+        self._executors = {}
+        # Writers running on each device: tasks plus the helpers they borrowed slots for
+        self._device_slots = {}
+        # Several threads may submit at once (the daemon's scheduler and walkers)
+        self._executors_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(jobs)
+        # Bound the number of queued tasks so huge trees are not all held in memory
+        self._pending = threading.BoundedSemaphore(jobs * 4)
+
+    def device_limit(self, st_dev):
+        """Maximum number of concurrent tasks allowed on one device"""
+        return device_limit(st_dev, self.jobs, self.per_device)
+
+    def _executor(self, st_dev):
+        with self._executors_lock:
+            executor = self._executors.get(st_dev)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=self.device_limit(st_dev),
+                                              thread_name_prefix=f"erase-{st_dev:x}")
+                self._executors[st_dev] = executor
+                self._device_slots[st_dev] = threading.BoundedSemaphore(self.device_limit(st_dev))
+            return executor
+
+    def _run(self, st_dev, fn, args):
+        with self._device_slots[st_dev], self._slots:
+            _worker.pool = self
+            try:
+                return fn(*args)
+            finally:
+                _worker.pool = None
+
+    def borrow(self, st_dev, count):
+        """Take up to `count` free slots on device st_dev without waiting; returns how many"""
+        self._executor(st_dev)
+        device = self._device_slots[st_dev]
+        taken = 0
+        while taken < count and device.acquire(blocking=False):
+            if not self._slots.acquire(blocking=False):
+                device.release()
+                break
+            taken += 1
+        return taken
+
+    def give_back(self, st_dev, count):
+        """Return slots taken with borrow()"""
+        for _ in range(count):
+            self._slots.release()
+            self._device_slots[st_dev].release()
+
+    def submit(self, st_dev, fn, *args):
+        """Queue fn(*args) on the executor for device st_dev and return its Future"""
+        self._pending.acquire()
+        future = self._executor(st_dev).submit(self._run, st_dev, fn, args)
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def shutdown(self):
+        """Wait for every queued task on every device to finish"""
+        with self._executors_lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
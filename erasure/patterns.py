@@ -0,0 +1,183 @@
+import ctypes
+import ctypes.util
+import hashlib
+import mmap
+import os
+import threading
+
+from config import PATTERN_BUFFER_SIZE
+
+
+class PatternSource:
+    """Supplies the bytes written by an overwrite pass, one chunk at a time"""
+
+    name = None
+
+    def chunk(self, buffer, length, offset=0):
+        """Return a memoryview of up to `length` bytes to write at file `offset`.
+
+        Dynamic sources fill `buffer` in place and return a view of it;
+        constant sources ignore `buffer` and return a view of their shared
+        precomputed data instead, which may be shorter than `length`.
+        """
+        raise NotImplementedError
+
+
+class UrandomSource(PatternSource):
+    """Reads every chunk straight from the kernel CSPRNG (the original behaviour)"""
+
+    name = 'urandom'
+
+    def __init__(self):
+        try:
+            self._device = open('/dev/urandom', 'rb', buffering=0)
+        except OSError:
+            self._device = None
+
+    def chunk(self, buffer, length, offset=0):
+        view = memoryview(buffer)[:length]
+        if self._device is None:
+            view[:] = os.urandom(length)
+            return view
+        filled = 0
+        while filled < length:
+            filled += self._device.readinto(view[filled:])
+        return view
+
+
+class _LibcryptoChaCha20:
+    """ChaCha20 keystream from the libcrypto that CPython's hashlib/ssl link against"""
+
+    _lib = None
+
+    @classmethod
+    def _load(cls):
+        if cls._lib is None:
+            path = ctypes.util.find_library('crypto')
+            if not path:
+                raise OSError("libcrypto not found")
+            lib = ctypes.CDLL(path)
+            lib.EVP_CIPHER_CTX_new.restype = ctypes.c_void_p
+            lib.EVP_CIPHER_CTX_free.argtypes = [ctypes.c_void_p]
+            lib.EVP_chacha20.restype = ctypes.c_void_p
+            lib.EVP_EncryptInit_ex.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+                                               ctypes.c_char_p, ctypes.c_char_p]
+            lib.EVP_EncryptUpdate.argtypes = [ctypes.c_void_p, ctypes.c_void_p,
+                                              ctypes.POINTER(ctypes.c_int), ctypes.c_void_p, ctypes.c_int]
+            cls._lib = lib
+        return cls._lib
+
+    def __init__(self, key, nonce):
+        lib = self._load()
+        self._ctx = lib.EVP_CIPHER_CTX_new()
+        if not self._ctx or lib.EVP_EncryptInit_ex(self._ctx, lib.EVP_chacha20(), None, key, nonce) != 1:
+            raise OSError("could not initialise ChaCha20")
+        self._outlen = ctypes.c_int()
+
+    def fill(self, view):
+        # Encrypting zeros in place leaves the raw keystream in the buffer
+        length = len(view)
+        address = (ctypes.c_char * length).from_buffer(view)
+        ctypes.memset(address, 0, length)
+        self._lib.EVP_EncryptUpdate(self._ctx, address, ctypes.byref(self._outlen), address, length)
+
+    def __del__(self):
+        if getattr(self, '_ctx', None) and self._lib is not None:
+            self._lib.EVP_CIPHER_CTX_free(self._ctx)
+            self._ctx = None
+
+
+class _ShakeKeystream:
+    """SHAKE-256 in counter mode, used when libcrypto cannot be loaded"""
+
+    def __init__(self, key):
+        self._key = key
+        self._counter = 0
+
+    def fill(self, view):
+        block = hashlib.shake_256(self._key + self._counter.to_bytes(16, 'little'))
+        view[:] = block.digest(len(view))
+        self._counter += 1
+
+
+class KeystreamSource(PatternSource):
+    """Cryptographic keystream seeded once from os.urandom, then expanded in user space"""
+
+    name = 'keystream'
+
+    def __init__(self):
+        key = os.urandom(32)
+        try:
+            self._stream = _LibcryptoChaCha20(key, os.urandom(16))
+            self.backend = 'chacha20'
+        except (OSError, AttributeError):
+            self._stream = _ShakeKeystream(key)
+            self.backend = 'shake256'
+
+    def chunk(self, buffer, length, offset=0):
+        view = memoryview(buffer)[:length]
+        self._stream.fill(view)
+        return view
+
+
+_shared_patterns = {}
+_shared_lock = threading.Lock()
+
+
+def shared_pattern(pattern):
+    """Return a read-only view of `pattern` repeated over a page-aligned buffer.
+
+    Each distinct pattern is built once per process, in an anonymous mmap of
+    PATTERN_BUFFER_SIZE bytes plus one period, and then shared by every
+    file and thread that writes it.
+    """
+    with _shared_lock:
+        view = _shared_patterns.get(pattern)
+        if view is None:
+            period = len(pattern)
+            size = -(-(PATTERN_BUFFER_SIZE + period) // mmap.PAGESIZE) * mmap.PAGESIZE
+            region = mmap.mmap(-1, size)
+            region.write((pattern * (size // period + 1))[:size])
+            view = _shared_patterns[pattern] = memoryview(region).toreadonly()
+        return view
+
+
+class ConstantSource(PatternSource):
+    """Repeats a fixed byte pattern from a shared buffer that is never refilled"""
+
+    def __init__(self, pattern, name=None):
+        if not pattern:
+            raise ValueError("pattern must not be empty")
+        self.pattern = bytes(pattern)
+        self.name = name or 'pattern:' + self.pattern.hex()
+        self._data = None
+
+    def complement(self):
+        """Return a source writing the bitwise complement of this pattern"""
+        return ConstantSource(bytes(b ^ 0xFF for b in self.pattern))
+
+    def chunk(self, buffer, length, offset=0):
+        # Start at the right phase so the pattern runs on unbroken across chunks
+        if self._data is None:
+            self._data = shared_pattern(self.pattern)
+        phase = offset % len(self.pattern)
+        return self._data[phase:phase + min(length, PATTERN_BUFFER_SIZE)]
+
+
+# Sources whose output is unpredictable, used for the random passes of a scheme
+RANDOM_SOURCES = ('keystream', 'urandom')
+
+SOURCES = {
+    'urandom': UrandomSource,
+    'keystream': KeystreamSource,
+    'zeros': lambda: ConstantSource(b'\x00', name='zeros'),
+    'ones': lambda: ConstantSource(b'\xff', name='ones'),
+}
+
+
+def get_source(name):
+    """Create a new pattern source by name"""
+    try:
+        return SOURCES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown pattern source: {name}") from None
@@ -0,0 +1,326 @@
+import os
+import stat
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from erasure.parallel import is_rotational
+from utils.progress import format_bytes, format_duration
+from config import PLAN_SCAN_THREADS, PLAN_PROBE_BYTES
+
+
+# Upper bounds of the size-distribution buckets; the last bucket is open-ended
+SIZE_BUCKETS = [
+    ('< 4 KiB', 4 * 1024),
+    ('4 KiB - 64 KiB', 64 * 1024),
+    ('64 KiB - 1 MiB', 1024 * 1024),
+    ('1 MiB - 16 MiB', 16 * 1024 * 1024),
+    ('16 MiB - 256 MiB', 256 * 1024 * 1024),
+    ('256 MiB - 4 GiB', 4 * 1024 ** 3),
+    ('>= 4 GiB', None),
+]
+
+
+class DeviceStats:
+    """Files, bytes and size distribution found on one device"""
+
+    def __init__(self, st_dev):
+        self.st_dev = st_dev
+        self.files = 0
+        self.empty = 0
+        self.logical_bytes = 0
+        self.allocated_bytes = 0
+        # What --sparse would overwrite: allocated bytes, capped at each file's size
+        self.data_bytes = 0
+        self.largest = 0
+        self.buckets = [0] * len(SIZE_BUCKETS)
+        # A writable directory on this device for the throughput probe
+        self.probe_dir = None
+        self.rotational = False
+        self.throughput = None
+        self.sync_latency = None
+        self.eta = None
+
+    def add(self, st, directory):
+        size = st.st_size
+        self.files += 1
+        if size == 0:
+            self.empty += 1
+        self.logical_bytes += size
+        # st_blocks is in 512-byte units; platforms without it count the logical size
+        blocks = getattr(st, 'st_blocks', None)
+        allocated = blocks * 512 if blocks is not None else size
+        self.allocated_bytes += allocated
+        self.data_bytes += min(size, allocated)
+        self.largest = max(self.largest, size)
+        for index, (_, limit) in enumerate(SIZE_BUCKETS):
+            if limit is None or size < limit:
+                self.buckets[index] += 1
+                break
+        if self.probe_dir is None:
+            self.probe_dir = directory
+
+    def merge(self, other):
+        self.files += other.files
+        self.empty += other.empty
+        self.logical_bytes += other.logical_bytes
+        self.allocated_bytes += other.allocated_bytes
+        self.data_bytes += other.data_bytes
+        self.largest = max(self.largest, other.largest)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        if self.probe_dir is None:
+            self.probe_dir = other.probe_dir
+
+    def overwrite_bytes(self, sparse):
+        """Bytes one pass writes: only allocated data with --sparse"""
+        return self.data_bytes if sparse else self.logical_bytes
+
+    def as_dict(self, passes, sparse):
+        return {
+            'device': f"{os.major(self.st_dev)}:{os.minor(self.st_dev)}",
+            'rotational': self.rotational,
+            'files': self.files,
+            'empty_files': self.empty,
+            'logical_bytes': self.logical_bytes,
+            'allocated_bytes': self.allocated_bytes,
+            'largest_file': self.largest,
+            'io_bytes': self.overwrite_bytes(sparse) * passes,
+            'size_distribution': {label: count for (label, _), count in zip(SIZE_BUCKETS, self.buckets)},
+            'throughput_bytes_per_s': self.throughput,
+            'sync_latency_s': self.sync_latency,
+            'eta_seconds': self.eta,
+        }
+
+
+class PlanReport:
+    """What an erase of the scanned targets would do, and how long it would take"""
+
+    def __init__(self, passes, sparse, jobs):
+        # Number of target paths; they may arrive as a stream, so none are kept
+        self.targets = 0
+        self.passes = passes
+        self.sparse = sparse
+        self.jobs = jobs
+        self.devices = {}
+        self.directories = 0
+        self.skipped = 0
+        self.errors = 0
+        self.eta = None
+
+    @property
+    def files(self):
+        return sum(device.files for device in self.devices.values())
+
+    @property
+    def logical_bytes(self):
+        return sum(device.logical_bytes for device in self.devices.values())
+
+    @property
+    def allocated_bytes(self):
+        return sum(device.allocated_bytes for device in self.devices.values())
+
+    @property
+    def io_bytes(self):
+        return sum(device.overwrite_bytes(self.sparse) for device in self.devices.values()) * self.passes
+
+    def device(self, st_dev):
+        stats = self.devices.get(st_dev)
+        if stats is None:
+            stats = self.devices[st_dev] = DeviceStats(st_dev)
+        return stats
+
+    def as_dict(self):
+        return {
+            'targets': self.targets,
+            'passes': self.passes,
+            'sparse': self.sparse,
+            'files': self.files,
+            'directories': self.directories,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'logical_bytes': self.logical_bytes,
+            'allocated_bytes': self.allocated_bytes,
+            'io_bytes': self.io_bytes,
+            'eta_seconds': self.eta,
+            'devices': [device.as_dict(self.passes, self.sparse) for device in self.devices.values()],
+        }
+
+    def lines(self):
+        """Human-readable report, one line per entry"""
+        lines = [
+            f"[i] Plan for {self.targets} path(s), {self.passes} passes"
+            + (" (sparse: allocated extents only)" if self.sparse else ""),
+            f"  Files: {self.files}  Directories: {self.directories}  "
+            f"Skipped (not regular files): {self.skipped}  Unreadable: {self.errors}",
+            f"  Logical size: {format_bytes(self.logical_bytes)}  "
+            f"Allocated: {format_bytes(self.allocated_bytes)}",
+            f"  Total I/O: {format_bytes(self.io_bytes)} ({self.passes} passes)",
+        ]
+        for device in self.devices.values():
+            kind = "rotational" if device.rotational else "non-rotational"
+            lines.append(f"  Device {os.major(device.st_dev)}:{os.minor(device.st_dev)} ({kind}): "
+                         f"{device.files} files, {format_bytes(device.logical_bytes)} logical, "
+                         f"{format_bytes(device.allocated_bytes)} allocated, "
+                         f"largest {format_bytes(device.largest)}")
+            for (label, _), count in zip(SIZE_BUCKETS, device.buckets):
+                if count:
+                    lines.append(f"    {label:>16}: {count}")
+            if device.throughput:
+                lines.append(f"    Probe: {format_bytes(device.throughput)}/s write, "
+                             f"{device.sync_latency * 1000:.1f} ms per sync; "
+                             f"ETA {format_duration(device.eta)}")
+            elif device.files:
+                lines.append("    Probe: could not write a temp file here; no ETA for this device")
+        if self.eta is not None:
+            lines.append(f"[i] Estimated time: {format_duration(self.eta)}")
+        else:
+            lines.append("[!] Estimated time unavailable (throughput probe failed)")
+        return lines
+
+
+def _scan_directory(path):
+    """List one directory: per-device stats of its files and the subdirectories to scan next"""
+    devices = {}
+    subdirs = []
+    skipped = errors = 0
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return devices, subdirs, skipped, 1
+
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            # Like the erase walker, symlinked directories are never descended
+            if not entry.is_symlink():
+                subdirs.append(entry.path)
+            continue
+        try:
+            # The same single stat the erase takes: symlinks are followed
+            st = entry.stat(follow_symlinks=entry.is_symlink())
+        except OSError:
+            errors += 1
+            continue
+        if not stat.S_ISREG(st.st_mode):
+            skipped += 1
+            continue
+        stats = devices.get(st.st_dev)
+        if stats is None:
+            stats = devices[st.st_dev] = DeviceStats(st.st_dev)
+        stats.add(st, path)
+    return devices, subdirs, skipped, errors
+
+
+class Planner:
+    """Dry run of an erase: scans the targets in parallel and estimates its cost.
+
+    Nothing under the targets is opened for writing. The only write is a
+    short throughput probe per device, made against a temp file that is
+    removed straight away.
+    """
+
+    def __init__(self, overwriter, scan_threads=PLAN_SCAN_THREADS, probe_bytes=PLAN_PROBE_BYTES):
+        self.overwriter = overwriter
+        self.scan_threads = scan_threads
+        self.probe_bytes = probe_bytes
+
+    def plan(self, paths, passes, probe=True):
+        report = PlanReport(passes, self.overwriter.sparse, self.overwriter.jobs)
+        self.scan(paths, report)
+        if probe:
+            self.estimate(report)
+        return report
+
+    def scan(self, paths, report):
+        """Fill `report` with the files under `paths`"""
+        with ThreadPoolExecutor(max_workers=self.scan_threads, thread_name_prefix="plan-scan") as pool:
+            pending = set()
+            for path in paths:
+                report.targets += 1
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    report.errors += 1
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    report.directories += 1
+                    pending.add(pool.submit(_scan_directory, path))
+                elif stat.S_ISREG(st.st_mode):
+                    report.device(st.st_dev).add(st, os.path.dirname(os.path.abspath(path)))
+                else:
+                    report.skipped += 1
+
+            # Results are folded in on this thread, so the report needs no lock
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    devices, subdirs, skipped, errors = future.result()
+                    for st_dev, stats in devices.items():
+                        report.device(st_dev).merge(stats)
+                    report.skipped += skipped
+                    report.errors += errors
+                    report.directories += len(subdirs)
+                    for subdir in subdirs:
+                        pending.add(pool.submit(_scan_directory, subdir))
+        return report
+
+    def estimate(self, report):
+        """Probe each device and turn the byte counts into an ETA"""
+        durability = self.overwriter.durability
+        etas = []
+        for device in report.devices.values():
+            device.rotational = is_rotational(device.st_dev)
+            if not device.files:
+                continue
+            probe = self.probe(device.probe_dir)
+            if probe is None:
+                continue
+            device.throughput, device.sync_latency = probe
+            io_bytes = device.overwrite_bytes(report.sparse) * report.passes
+            syncs = durability.syncs_for(device.files - device.empty, report.passes)
+            device.eta = io_bytes / device.throughput + syncs * device.sync_latency
+            etas.append(device.eta)
+
+        if etas and len(etas) == sum(1 for device in report.devices.values() if device.files):
+            # With --jobs every device is erased at the same time; otherwise one after another
+            report.eta = max(etas) if report.jobs > 1 else sum(etas)
+        elif not any(device.files for device in report.devices.values()):
+            report.eta = 0.0
+        return report
+
+    def probe(self, directory):
+        """Measure (write bytes/s, seconds per sync) with a temp file in `directory`"""
+        try:
+            fd, probe_path = tempfile.mkstemp(dir=directory, prefix='.secure-erase-probe-')
+        except OSError:
+            return None
+        try:
+            buffer, source = self.overwriter._thread_state()
+            chunk_size = self.overwriter.chunk_size
+            sync = getattr(os, 'fdatasync', os.fsync)
+
+            start = time.perf_counter()
+            offset = 0
+            while offset < self.probe_bytes:
+                length = min(chunk_size, self.probe_bytes - offset)
+                offset += os.write(fd, source.chunk(buffer, length, offset))
+            sync(fd)
+            throughput = self.probe_bytes / max(time.perf_counter() - start, 1e-9)
+
+            # Cost of a sync with almost nothing to write, paid per file or per pass
+            samples = []
+            for i in range(3):
+                os.pwrite(fd, b"\0" * 4096, i * 4096)
+                start = time.perf_counter()
+                sync(fd)
+                samples.append(time.perf_counter() - start)
+            return throughput, sorted(samples)[1]
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+            os.unlink(probe_path)
@@ -0,0 +1,98 @@
+import threading
+
+from config import (SCHEDULE_WINDOW_FILES, SCHEDULE_WINDOW_DIRS, SMALL_FILE_SIZE, SMALL_BATCH_FILES,
+                    SMALL_BATCH_BYTES, SCHEDULE_FILE_COST)
+
+
+class WorkUnit:
+    """Files on one device that a worker erases one after another"""
+
+    __slots__ = ('st_dev', 'items', 'cost')
+
+    def __init__(self, st_dev):
+        self.st_dev = st_dev
+        # (FileEntry, whether other paths may share its inode)
+        self.items = []
+        self.cost = 0
+
+    def add(self, entry, shared, cost):
+        self.items.append((entry, shared))
+        self.cost += cost
+
+
+class SizeScheduler:
+    """Orders walked files for the worker pool: largest first, small files batched.
+
+    Files are held in windows of up to `window` files. A full window is
+    released as work units sorted by estimated cost, largest first
+    (longest-processing-time order): large files start as early as the
+    window allows instead of when the walk reaches them, and small files,
+    batched per device, fill the workers around them. A file's cost is
+    its size plus `file_cost` bytes for the fixed open, sync and unlink
+    work.
+
+    Every held entry, and every released one until done() is called for
+    it, keeps its directory descriptor open. The window is also released
+    once `max_dirs` directories are open, and wait_for_room() holds the
+    walk back until finished files bring that below `max_dirs` again.
+    """
+
+    def __init__(self, window=SCHEDULE_WINDOW_FILES, max_dirs=SCHEDULE_WINDOW_DIRS, small_size=SMALL_FILE_SIZE,
+                 batch_files=SMALL_BATCH_FILES, batch_bytes=SMALL_BATCH_BYTES, file_cost=SCHEDULE_FILE_COST):
+        self.window = window
+        self.max_dirs = max_dirs
+        self.small_size = small_size
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.file_cost = file_cost
+        self._held = []
+        # dir_fd -> held entries plus released entries not yet done
+        self._open = {}
+        self._cond = threading.Condition()
+
+    def add(self, entry, shared=False):
+        """Hold a file; returns the units to run now, in order (empty until the window fills)"""
+        self._held.append((entry, shared))
+        with self._cond:
+            if entry.dir_fd is not None:
+                self._open[entry.dir_fd] = self._open.get(entry.dir_fd, 0) + 1
+            open_dirs = len(self._open)
+        if len(self._held) >= self.window or open_dirs >= self.max_dirs:
+            return self.drain()
+        return []
+
+    def done(self, dir_fd):
+        """Record that a released entry from dir_fd has been erased and released"""
+        if dir_fd is None:
+            return
+        with self._cond:
+            self._open[dir_fd] -= 1
+            if not self._open[dir_fd]:
+                del self._open[dir_fd]
+                self._cond.notify_all()
+
+    def wait_for_room(self):
+        """Block until fewer than max_dirs directories are open for scheduled files"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._open) < self.max_dirs)
+
+    def drain(self):
+        """Release everything held as units, most expensive first"""
+        units = []
+        batches = {}
+        for entry, shared in self._held:
+            size = entry.size
+            cost = size + self.file_cost
+            if size >= self.small_size:
+                unit = WorkUnit(entry.stat.st_dev)
+                unit.add(entry, shared, cost)
+                units.append(unit)
+                continue
+            batch = batches.get(entry.stat.st_dev)
+            if batch is None or len(batch.items) >= self.batch_files or batch.cost + cost > self.batch_bytes:
+                batch = batches[entry.stat.st_dev] = WorkUnit(entry.stat.st_dev)
+                units.append(batch)
+            batch.add(entry, shared, cost)
+        self._held = []
+        units.sort(key=lambda unit: unit.cost, reverse=True)
+        return units
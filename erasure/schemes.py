@@ -0,0 +1,68 @@
+from erasure.patterns import ConstantSource
+
+
+# A pass that writes unpredictable data from the run's random source
+RANDOM = None
+
+
+class Scheme:
+    """A named overwrite method: a fixed schedule of passes.
+
+    Each pass is either RANDOM or a fixed byte pattern. Fixed-pattern
+    sources are created once with the scheme and are stateless, so every
+    file and thread shares them and their precomputed buffers.
+    """
+
+    def __init__(self, name, description, passes, verify=None):
+        self.name = name
+        self.description = description
+        self.patterns = list(passes)
+        # Read-back check of the final pass the method calls for, if any
+        self.verify = verify
+        self._sources = [None if p is RANDOM else ConstantSource(p) for p in self.patterns]
+
+    @property
+    def passes(self):
+        return len(self.patterns)
+
+    @property
+    def uses_random(self):
+        """Whether any pass writes the run's random source"""
+        return any(p is RANDOM for p in self.patterns)
+
+    def source(self, pass_index):
+        """The fixed-pattern source for a pass, or None for a random pass"""
+        return self._sources[pass_index]
+
+
+# The 27 deterministic passes (5-31) of Gutmann's 35-pass method
+GUTMANN_FIXED = [
+    b'\x55', b'\xaa',
+    b'\x92\x49\x24', b'\x49\x24\x92', b'\x24\x92\x49',
+    b'\x00', b'\x11', b'\x22', b'\x33', b'\x44', b'\x55', b'\x66', b'\x77',
+    b'\x88', b'\x99', b'\xaa', b'\xbb', b'\xcc', b'\xdd', b'\xee', b'\xff',
+    b'\x92\x49\x24', b'\x49\x24\x92', b'\x24\x92\x49',
+    b'\x6d\xb6\xdb', b'\xb6\xdb\x6d', b'\xdb\x6d\xb6',
+]
+
+# DoD 5220.22-M: a character, its complement, then random data
+_DOD = [b'\x00', b'\xff', RANDOM]
+
+SCHEMES = {
+    'zero': Scheme('zero', "Single pass of zeros", [b'\x00']),
+    'random': Scheme('random', "Single pass of random data", [RANDOM]),
+    'random-verify': Scheme('random-verify', "Single random pass, read back in full", [RANDOM], verify='full'),
+    'dod3': Scheme('dod3', "DoD 5220.22-M, 3 passes, final pass verified", _DOD, verify='sample'),
+    'dod7': Scheme('dod7', "DoD 5220.22-M ECE, 7 passes, final pass verified",
+                   _DOD + [RANDOM] + _DOD, verify='sample'),
+    'gutmann35': Scheme('gutmann35', "Gutmann, 35 passes: 4 random, 27 fixed, 4 random",
+                        [RANDOM] * 4 + GUTMANN_FIXED + [RANDOM] * 4),
+}
+
+
+def get_scheme(name):
+    """Look up an overwrite method by name"""
+    try:
+        return SCHEMES[name]
+    except KeyError:
+        raise ValueError(f"Unknown erase method: {name}") from None
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import random
+
+from config import VERIFY_SAMPLES, VERIFY_BLOCK_SIZE
+
+
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+
+def drop_cache(fd):
+    """Evict a file's clean pages so the next read comes from the device.
+
+    Returns False where posix_fadvise is unavailable and reads may be
+    served from the page cache.
+    """
+    fadvise = getattr(os, 'posix_fadvise', None)
+    if fadvise is None:
+        return False
+    try:
+        fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        return False
+    return True
+
+
+def _clip(extents, start_offset):
+    """The parts of `extents` at or after start_offset"""
+    clipped = []
+    for start, length in extents:
+        end = start + length
+        if end > start_offset:
+            start = max(start, start_offset)
+            clipped.append((start, end - start))
+    return clipped
+
+
+class VerifyState:
+    """What the final pass of one file wrote, as far as verification needs it.
+
+    In 'full' mode this is a running hash of every byte written; in
+    'sample' mode a digest of each sampled block. The Overwriter feeds it
+    every chunk of the final pass through observe().
+    """
+
+    def __init__(self, blocks=None, extents=None):
+        # Sorted (offset, length) blocks to check, or None to hash everything
+        self.blocks = blocks
+        self.extents = extents
+        self.hasher = hashlib.blake2b() if blocks is None else None
+        self.digests = []
+        self._next = 0
+        self._pending = bytearray()
+
+    def observe(self, offset, data):
+        """Record a chunk of final-pass data written at `offset`"""
+        if self.hasher is not None:
+            self.hasher.update(data)
+            return
+        end = offset + len(data)
+        blocks = self.blocks
+        while self._next < len(blocks):
+            start, length = blocks[self._next]
+            if start >= end:
+                return
+            block_end = start + length
+            lo = max(start, offset)
+            hi = min(block_end, end)
+            if hi > lo:
+                self._pending += data[lo - offset:hi - offset]
+            if block_end > end:
+                # The block continues in the next chunk
+                return
+            self.digests.append(hashlib.blake2b(self._pending).digest())
+            self._pending.clear()
+            self._next += 1
+
+
+class Verifier:
+    """Reads back the final pass and compares it with what was written.
+
+    'full' re-reads every overwritten byte; 'sample' re-reads `samples`
+    random blocks of `block_size` bytes, so the cost stays flat whatever
+    the file size. The file is synced and its cached pages dropped first,
+    so the read-back comes from the device and not from memory.
+    """
+
+    MODES = ('full', 'sample')
+
+    def __init__(self, mode='sample', samples=VERIFY_SAMPLES, block_size=VERIFY_BLOCK_SIZE):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown verification mode: {mode}")
+        if samples < 1:
+            raise ValueError("samples must be at least 1")
+        self.mode = mode
+        self.samples = samples
+        self.block_size = block_size
+        self._random = random.SystemRandom()
+
+    def start(self, extents, start_offset=0):
+        """Prepare to verify a final pass over `extents` that begins at start_offset"""
+        extents = _clip(extents, start_offset)
+        if self.mode == 'full':
+            return VerifyState(extents=extents)
+        return VerifyState(blocks=self._sample_blocks(extents), extents=extents)
+
+    def _sample_blocks(self, extents):
+        bs = self.block_size
+        # Index every block-sized piece of the extents without materialising them
+        counts = [-(-length // bs) for _, length in extents]
+        total = sum(counts)
+        picks = sorted(self._random.sample(range(total), min(self.samples, total)))
+        blocks = []
+        extent = 0
+        first_index = 0
+        for pick in picks:
+            while pick >= first_index + counts[extent]:
+                first_index += counts[extent]
+                extent += 1
+            start, length = extents[extent]
+            block_start = start + (pick - first_index) * bs
+            blocks.append((block_start, min(bs, start + length - block_start)))
+        return blocks
+
+    def check(self, fd, state, buffer):
+        """Read the data back from the device; returns (matched, bytes checked).
+
+        `buffer` is a reusable bytearray the reads are made into.
+        """
+        _fdatasync(fd)
+        drop_cache(fd)
+        if len(buffer) < self.block_size:
+            buffer = bytearray(self.block_size)
+        view = memoryview(buffer)
+        checked = 0
+        if state.hasher is not None:
+            hasher = hashlib.blake2b()
+            for start, length in state.extents:
+                offset = start
+                end = start + length
+                while offset < end:
+                    count = _read_into(fd, view[:min(len(view), end - offset)], offset)
+                    if count == 0:
+                        return False, checked
+                    hasher.update(view[:count])
+                    offset += count
+                    checked += count
+            return hasher.digest() == state.hasher.digest(), checked
+
+        for (start, length), expected in zip(state.blocks, state.digests):
+            count = _read_into(fd, view[:length], start)
+            checked += count
+            if count != length or hashlib.blake2b(view[:count]).digest() != expected:
+                return False, checked
+        return len(state.digests) == len(state.blocks), checked
+
+
+def _read_into(fd, view, offset):
+    preadv = getattr(os, 'preadv', None)
+    if preadv is not None:
+        return preadv(fd, [view], offset)
+    data = os.pread(fd, len(view), offset)
+    view[:len(data)] = data
+    return len(data)
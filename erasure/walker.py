@@ -0,0 +1,218 @@
+import os
+import stat
+import threading
+
+
+_ROOT_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)
+# Below the root, never follow a directory that was swapped for a symlink
+_DIR_FLAGS = _ROOT_FLAGS | getattr(os, 'O_NOFOLLOW', 0)
+
+
+class DirHandle:
+    """Reference-counted descriptor for a directory being walked.
+
+    The walker holds one reference while it scans the directory and every
+    entry yielded from it holds another, so the descriptor stays valid for
+    dir_fd-relative open/unlink even when entries are erased on other
+    threads after the walk has moved on.
+    """
+
+    def __init__(self, fd, path):
+        self.fd = fd
+        self.path = path
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            if self._refs:
+                return
+        os.close(self.fd)
+
+
+class FileEntry:
+    """A file to erase, with the single stat result taken for it during the walk"""
+
+    __slots__ = ('path', 'name', 'stat', 'follow_symlinks', '_dir')
+
+    def __init__(self, path, name, stat_result, dir_handle=None, follow_symlinks=False):
+        self.path = path
+        self.name = name
+        self.stat = stat_result
+        self.follow_symlinks = follow_symlinks
+        self._dir = dir_handle
+
+    @property
+    def dir_fd(self):
+        return self._dir.fd if self._dir is not None else None
+
+    @property
+    def size(self):
+        return self.stat.st_size
+
+    @property
+    def is_file(self):
+        return stat.S_ISREG(self.stat.st_mode)
+
+    @classmethod
+    def from_path(cls, path):
+        """Build an entry for a standalone path (one stat, following symlinks)"""
+        return cls(path, path, os.stat(path), follow_symlinks=True)
+
+    def open(self, direct=False):
+        """Open the file for overwriting relative to its directory descriptor"""
+        flags = os.O_RDWR
+        if direct:
+            flags |= getattr(os, 'O_DIRECT', 0)
+        if not self.follow_symlinks:
+            flags |= getattr(os, 'O_NOFOLLOW', 0)
+        return os.open(self.name, flags, dir_fd=self.dir_fd)
+
+    def unlink(self):
+        os.unlink(self.name, dir_fd=self.dir_fd)
+
+    def release(self):
+        """Drop this entry's hold on its directory descriptor"""
+        if self._dir is not None:
+            self._dir.release()
+            self._dir = None
+
+
+class DirectoryEntry:
+    """A subdirectory to remove once everything beneath it has been erased"""
+
+    __slots__ = ('path', 'name', '_dir')
+
+    def __init__(self, path, name, dir_handle):
+        self.path = path
+        self.name = name
+        self._dir = dir_handle
+
+    def rmdir(self):
+        os.rmdir(self.name, dir_fd=self._dir.fd)
+
+    def release(self):
+        if self._dir is not None:
+            self._dir.release()
+            self._dir = None
+
+
+class SkippedEntry:
+    """A file the caller asked the walker to pass over without stat'ing it"""
+
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+
+    def release(self):
+        pass
+
+
+class DirectoryLoop:
+    """A directory that is the same directory as one already walked (a bind mount or loop)"""
+
+    __slots__ = ('path', 'first_path')
+
+    def __init__(self, path, first_path):
+        self.path = path
+        self.first_path = first_path
+
+    def release(self):
+        pass
+
+
+class WalkError:
+    """A file that could be listed but not stat'ed (e.g. a dangling symlink)"""
+
+    __slots__ = ('path', 'error')
+
+    def __init__(self, path, error):
+        self.path = path
+        self.error = error
+
+    def release(self):
+        pass
+
+
+def walk(path, skip=None):
+    """Walk a directory tree with os.scandir and directory descriptors.
+
+    Yields, for each directory, a FileEntry for every non-directory in it,
+    then everything beneath its subdirectories, then a DirectoryEntry for
+    each subdirectory so it can be removed bottom-up. The root itself is
+    not yielded. Like os.walk, symlinks to directories are listed as
+    directories but never descended into. Each file costs exactly one
+    stat; the caller must release() every item it receives.
+
+    `skip`, if given, is called with each file path before it is stat'ed;
+    files it accepts are yielded as SkippedEntry instead.
+
+    Directories are identified by (st_dev, st_ino) as they are opened; one
+    reached a second time, through a bind mount or a mount loop, is
+    yielded as a DirectoryLoop and not descended into again.
+    """
+    root = DirHandle(os.open(path, _ROOT_FLAGS), path)
+    try:
+        yield from _walk_dir(root, skip, {_identity(root.fd): path})
+    finally:
+        root.release()
+
+
+def _identity(fd):
+    st = os.fstat(fd)
+    return st.st_dev, st.st_ino
+
+
+def _walk_dir(handle, skip, visited):
+    subdirs = []
+    with os.scandir(handle.fd) as it:
+        entries = list(it)
+
+    for entry in entries:
+        entry_path = os.path.join(handle.path, entry.name)
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            subdirs.append((entry, entry_path))
+            continue
+        if skip is not None and skip(entry_path):
+            yield SkippedEntry(entry_path)
+            continue
+
+        is_link = entry.is_symlink()
+        try:
+            # DirEntry.stat is a single fstatat() relative to handle.fd
+            stat_result = entry.stat(follow_symlinks=is_link)
+        except OSError as e:
+            yield WalkError(entry_path, e)
+            continue
+        yield FileEntry(entry_path, entry.name, stat_result, handle.acquire(), follow_symlinks=is_link)
+
+    for entry, entry_path in subdirs:
+        if not entry.is_symlink():
+            try:
+                fd = os.open(entry.name, _DIR_FLAGS, dir_fd=handle.fd)
+            except OSError:
+                fd = None
+            if fd is not None:
+                identity = _identity(fd)
+                if identity in visited:
+                    os.close(fd)
+                    yield DirectoryLoop(entry_path, visited[identity])
+                    continue
+                visited[identity] = entry_path
+                child = DirHandle(fd, entry_path)
+                try:
+                    yield from _walk_dir(child, skip, visited)
+                finally:
+                    child.release()
+        yield DirectoryEntry(entry_path, entry.name, handle.acquire())
@@ -1,14 +1,43 @@
 import pytest
+import csv
+import errno
+import io
+import json
 import os
+import resource
 import tempfile
+import threading
+import time
+import tracemalloc
 import shutil
+from contextlib import contextmanager
 from unittest.mock import Mock, patch, mock_open
 from pathlib import Path
 
 # Import the classes we want to test
 from erasure.overwrite import Overwriter
-from utils.logger import Logger
+from erasure.patterns import ConstantSource, KeystreamSource, get_source
+from erasure.parallel import DevicePool
+from erasure.durability import BatchedSync
+from erasure.extents import data_extents
+from erasure.walker import walk, FileEntry, DirectoryLoop
+from erasure.job import JobManifest
+from erasure.planner import Planner
+from erasure.verify import Verifier
+from erasure.schemes import SCHEMES
+from erasure.freespace import FreeSpaceWiper, available_bytes
+from erasure.patterns import shared_pattern
+from erasure.direct import O_DIRECT
+from erasure.scheduler import SizeScheduler
+from erasure.extents import full_extent
+from erasure.daemon import EraseDaemon, request as daemon_request
+from utils.logger import Logger, BufferedLogger
+from utils.audit_store import AuditStore
+from utils.metrics import Metrics
+from utils.progress import ProgressReporter, JsonReporter
 from cli.cli import SecureEraseCLI
+from cli import path_input
+from cli.path_input import read_paths, unique_paths
 
 
 class TestOverwriter:
@@ -49,6 +78,17 @@ class TestOverwriter:
         assert result is True
         assert not os.path.exists(test_file)
         overwriter.logger.log.assert_called_once()
+
+    def test_overwrite_logs_size_of_erased_file(self, overwriter, temp_dir):
+        """Test that the logger is handed the size rather than re-stat'ing a deleted path"""
+        test_file = os.path.join(temp_dir, "sized.bin")
+        with open(test_file, 'wb') as f:
+            f.write(b"x" * 1234)
+
+        overwriter.overwrite_and_delete(test_file, passes=1)
+
+        overwriter.logger.log.assert_called_once_with(test_file, 1, success=True, file_size=1234,
+                                                        bytes_overwritten=1234)
     
     def test_overwrite_empty_file(self, overwriter, temp_dir):
         """Test handling of empty files"""
@@ -65,7 +105,7 @@ class TestOverwriter:
         # Verify erasure was successful
         assert result is True
         assert not os.path.exists(test_file)
-        overwriter.logger.log.assert_called_once_with(test_file, 3, success=True)
+        overwriter.logger.log.assert_called_once_with(test_file, 3, success=True, file_size=0, bytes_overwritten=0)
     
     def test_overwrite_nonexistent_file(self, overwriter):
         """Test handling of non-existent files"""
@@ -110,9 +150,1050 @@ class TestOverwriter:
         
         # Verify logger was called for each file
         assert overwriter.logger.log.call_count == 3
-    
+
+    def test_overwrite_memory_bounded_by_chunk_size(self, temp_dir):
+        """Test that a pass never allocates more than about one chunk"""
+        chunk_size = 1024 * 1024
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=chunk_size)
+        test_file = os.path.join(temp_dir, "big.bin")
+        with open(test_file, 'wb') as f:
+            f.truncate(64 * chunk_size)
+
+        tracemalloc.start()
+        try:
+            result = overwriter.overwrite_and_delete(test_file, passes=1)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert result is True
+        assert not os.path.exists(test_file)
+        assert peak < 4 * chunk_size
+
+    @pytest.mark.skipif(not os.environ.get('SECURE_ERASE_LARGE_TESTS'),
+                        reason="set SECURE_ERASE_LARGE_TESTS=1 to erase a multi-GB file")
+    def test_overwrite_multi_gb_sparse_file_flat_rss(self, temp_dir):
+        """Test that erasing a multi-GB sparse-backed file keeps peak RSS flat"""
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=4 * 1024 * 1024)
+        test_file = os.path.join(temp_dir, "disk.img")
+        with open(test_file, 'wb') as f:
+            f.truncate(3 * 1024 ** 3)
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result = overwriter.overwrite_and_delete(test_file, passes=1)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        assert result is True
+        # ru_maxrss is reported in KiB on Linux
+        assert (rss_after - rss_before) < 64 * 1024
+
+    def test_process_directory_parallel(self, temp_dir):
+        """Test that --jobs erases a nested tree with the same accounting as serial mode"""
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=4096, jobs=4)
+        for d in range(3):
+            subdir = os.path.join(temp_dir, f"dir{d}", "nested")
+            os.makedirs(subdir)
+            for i in range(5):
+                with open(os.path.join(subdir, f"f{i}.bin"), 'wb') as f:
+                    f.write(os.urandom(10000))
+
+        result = overwriter.process_path(temp_dir, passes=2)
+
+        assert result is True
+        assert not os.path.exists(temp_dir)
+        assert overwriter.logger.log.call_count == 15
+
+    def test_device_pool_respects_per_device_limit(self):
+        """Test that no device runs more tasks at once than its limit"""
+        active = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def task():
+            with lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            time.sleep(0.01)
+            with lock:
+                active['now'] -= 1
+            return True
+
+        with DevicePool(jobs=8, per_device=2) as pool:
+            futures = [pool.submit(0, task) for _ in range(12)]
+
+        assert all(f.result() for f in futures)
+        assert active['max'] == 2
+
+    def test_device_pool_lends_only_free_device_slots(self):
+        """Test that a running task can only borrow slots its device has free"""
+        def borrow_twice():
+            taken = pool.borrow(0, 5)
+            again = pool.borrow(0, 5)
+            pool.give_back(0, taken + again)
+            return taken, again
+
+        with DevicePool(jobs=8, per_device=3) as pool:
+            assert pool.submit(0, borrow_twice).result() == (2, 0)
+            assert pool.submit(0, borrow_twice).result() == (2, 0)
+        with DevicePool(jobs=8, per_device=1) as pool:
+            assert pool.submit(0, borrow_twice).result() == (0, 0)
+
+    def test_device_pool_creates_one_executor_per_device_across_threads(self):
+        """Test that concurrent submitters never get two executors for the same device"""
+        pool = DevicePool(jobs=4, per_device=1)
+        real_limit = pool.device_limit
+
+        def slow_limit(st_dev):
+            time.sleep(0.01)
+            return real_limit(st_dev)
+
+        pool.device_limit = slow_limit
+        executors = []
+        threads = [threading.Thread(target=lambda: executors.append(pool._executor(0))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        pool.shutdown()
+
+        assert len({id(e) for e in executors}) == 1
+
+    def test_invalid_chunk_size_rejected(self):
+        """Test that a non-positive chunk size is refused"""
+        with pytest.raises(ValueError):
+            Overwriter(Mock(spec=Logger), chunk_size=0)
+
+
+
+
+class TestPatternSources:
+    """Test cases for the overwrite pattern sources"""
+
+    def test_keystream_fills_buffer_in_place(self):
+        """Test that the keystream writes into the caller's buffer and never repeats"""
+        source = KeystreamSource()
+        buffer = bytearray(4096)
+        first = bytes(source.chunk(buffer, 4096))
+        second = source.chunk(buffer, 1024)
+
+        assert first != bytes(4096)
+        assert second.obj is buffer
+        assert bytes(second) != first[:1024]
+
+    def test_constant_pattern_keeps_phase_across_chunks(self):
+        """Test that multi-byte patterns tile seamlessly across chunk boundaries"""
+        source = ConstantSource(b'\x92\x49\x24')
+        data = b''.join(bytes(source.chunk(None, 5, offset)) for offset in range(0, 15, 5))
+
+        assert data == b'\x92\x49\x24' * 5
+        assert bytes(source.complement().chunk(None, 3)) == b'\x6d\xb6\xdb'
+
+    def test_unknown_source_rejected(self):
+        """Test that an unknown source name raises ValueError"""
+        with pytest.raises(ValueError):
+            get_source("nonsense")
+
+    def test_overwriter_writes_selected_pattern(self):
+        """Test that a pass writes the configured pattern over the whole file"""
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=1000, pattern='ones')
+        target = io.BytesIO(bytes(2500))
+
+        overwriter._write_pass(target, 2500)
+
+        assert target.getvalue() == b'\xff' * 2500
+
+
+class TestDurabilityPolicies:
+    """Test cases for the overwrite durability policies"""
+
+    def _write_file(self, directory, name, size=5000):
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(b"x" * size)
+        return path
+
+    @pytest.mark.parametrize("policy, expected_syncs", [("pass", 3), ("writeback", 3), ("final", 1), ("batch", 0)])
+    def test_sync_count_per_file(self, tmp_path, policy, expected_syncs):
+        """Test how many fdatasync calls each policy makes for a 3-pass erase"""
+        overwriter = Overwriter(Mock(spec=Logger), durability=policy)
+        test_file = self._write_file(str(tmp_path), "f.bin")
+
+        with patch('erasure.durability._fdatasync') as fdatasync:
+            assert overwriter.overwrite_and_delete(test_file, passes=3) is True
+
+        assert fdatasync.call_count == expected_syncs
+        assert not os.path.exists(test_file)
+
+    def test_batch_holds_descriptors_until_barrier(self, tmp_path):
+        """Test that batched sync keeps deleted files open until its barrier"""
+        overwriter = Overwriter(Mock(spec=Logger), durability='batch', sync_every=3)
+        policy = overwriter.durability
+        assert isinstance(policy, BatchedSync)
+
+        for i in range(2):
+            overwriter.overwrite_and_delete(self._write_file(str(tmp_path), f"f{i}.bin"), passes=1)
+        assert len(policy._held) == 2
+
+        overwriter.overwrite_and_delete(self._write_file(str(tmp_path), "f2.bin"), passes=1)
+        assert policy._held == []
+
+        overwriter.overwrite_and_delete(self._write_file(str(tmp_path), "f3.bin"), passes=1)
+        policy.finish()
+        assert policy._held == []
+
+
+class TestSparseExtents:
+    """Test cases for extent-aware overwriting of sparse files"""
+
+    MIB = 1024 * 1024
+
+    @pytest.fixture
+    def sparse_file(self, tmp_path):
+        """A 16 MiB file with 1 MiB of data at each end and a hole between"""
+        path = str(tmp_path / "sparse.img")
+        with open(path, 'wb') as f:
+            f.write(b"a" * self.MIB)
+            f.seek(15 * self.MIB)
+            f.write(b"z" * self.MIB)
+        with open(path, 'rb') as f:
+            if len(data_extents(f.fileno(), 16 * self.MIB)) < 2:
+                pytest.skip("filesystem does not report holes")
+        return path
+
+    def test_data_extents_skip_holes(self, sparse_file):
+        """Test that only the two allocated ranges are reported"""
+        with open(sparse_file, 'rb') as f:
+            extents = data_extents(f.fileno(), 16 * self.MIB)
+
+        assert extents[0][0] == 0
+        assert extents[-1][0] + extents[-1][1] == 16 * self.MIB
+        assert sum(length for _, length in extents) < 16 * self.MIB
+
+    def test_sparse_overwrite_leaves_holes_unallocated(self, sparse_file):
+        """Test that --sparse overwrites the data without filling the holes"""
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=self.MIB, sparse=True)
+        allocated_before = os.stat(sparse_file).st_blocks
+        allocated_during = []
+        real_write_pass = overwriter._write_pass
+
+        def write_pass(f, file_size, extents=None, **kwargs):
+            real_write_pass(f, file_size, extents, **kwargs)
+            f.flush()
+            allocated_during.append(os.fstat(f.fileno()).st_blocks)
+
+        overwriter._write_pass = write_pass
+        assert overwriter.overwrite_and_delete(sparse_file, passes=2) is True
+
+        assert max(allocated_during) <= allocated_before
+        _, kwargs = overwriter.logger.log.call_args
+        assert kwargs["file_size"] == 16 * self.MIB
+        assert kwargs["bytes_overwritten"] < 16 * self.MIB
+
+
+@pytest.mark.skipif(not O_DIRECT, reason="needs O_DIRECT")
+class TestDirectIO:
+    """Test cases for the O_DIRECT write path"""
+
+    def _direct(self, overwriter, path):
+        direct = overwriter._open_direct(lambda: os.open(path, os.O_RDWR | O_DIRECT), path)
+        if direct is None:
+            pytest.skip("filesystem does not support O_DIRECT")
+        return direct
+
+    def test_unaligned_chunk_size_is_refused(self):
+        """Test that direct I/O rejects a chunk size that would leave later writes unaligned"""
+        with pytest.raises(ValueError, match="multiple of 4096"):
+            Overwriter(Mock(spec=Logger), chunk_size=6000, direct=True)
+
+    @pytest.mark.parametrize("pattern", [b"\x00", b"\x92\x49\x24"])
+    def test_unaligned_tail_is_written_and_size_kept(self, tmp_path, pattern):
+        """Test that a pass covers a file whose size is not block-aligned, pattern phase intact"""
+        path = str(tmp_path / "odd.bin")
+        with open(path, 'wb') as f:
+            f.write(os.urandom(10000))
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=4096, direct=True, direct_depth=2)
+
+        with open(path, 'r+b') as f, self._direct(overwriter, path) as direct:
+            overwriter._write_pass(f, 10000, source=ConstantSource(pattern), direct=direct)
+
+        with open(path, 'rb') as f:
+            assert f.read() == (pattern * 10000)[:10000]
+
+    def test_erase_reads_back_what_direct_io_wrote(self, tmp_path):
+        """Test a full erase with --direct and --verify full"""
+        path = tmp_path / "secret.bin"
+        path.write_bytes(os.urandom(3 * 4096 + 123))
+        self._direct(Overwriter(Mock(spec=Logger)), str(path)).close()
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=8192, direct=True, verify='full')
+
+        assert overwriter.overwrite_and_delete(str(path), passes=2) is True
+
+        assert not path.exists()
+        assert overwriter.logger.log.call_args.kwargs['bytes_verified'] == 3 * 4096 + 123
+
+    def test_unsupported_filesystem_falls_back_with_one_warning(self):
+        """Test that EINVAL from an O_DIRECT open means buffered writes, not a failure"""
+        overwriter = Overwriter(Mock(spec=Logger), direct=True, reporter=Mock())
+
+        def refuse():
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+        assert overwriter._open_direct(refuse, "/a") is None
+        assert overwriter._open_direct(refuse, "/b") is None
+        overwriter.reporter.warning.assert_called_once()
+
+
+class TestScheduler:
+    """Test cases for size-aware scheduling of directory erasure"""
+
+    def _entry(self, size, st_dev=1, dir_fd=3):
+        return Mock(size=size, stat=Mock(st_dev=st_dev), dir_fd=dir_fd)
+
+    def test_largest_first_and_small_files_batched_per_device(self):
+        """Test LPT order, with small files grouped into batches of one device each"""
+        scheduler = SizeScheduler(window=100, small_size=1000, batch_files=3, file_cost=0)
+        small = [self._entry(10, st_dev=i % 2) for i in range(7)]
+        big = self._entry(5000)
+        medium = self._entry(2000)
+        for entry in small[:4] + [medium] + small[4:] + [big]:
+            assert scheduler.add(entry) == []
+
+        units = scheduler.drain()
+
+        assert [unit.items[0][0] for unit in units[:2]] == [big, medium]
+        batches = units[2:]
+        assert sorted(len(unit.items) for unit in batches) == [1, 3, 3]
+        assert all({entry.stat.st_dev for entry, _ in unit.items} == {unit.st_dev} for unit in batches)
+
+    def test_window_is_released_when_it_spans_too_many_directories(self):
+        """Test that held entries never keep more than max_dirs directories open"""
+        scheduler = SizeScheduler(window=100, max_dirs=2)
+
+        assert scheduler.add(self._entry(1, dir_fd=10)) == []
+        units = scheduler.add(self._entry(1, dir_fd=11))
+
+        assert sum(len(unit.items) for unit in units) == 2
+        assert scheduler.drain() == []
+
+    def test_pass_is_not_split_on_a_one_writer_device(self):
+        """Test that spinning disks and --jobs-per-device 1 never get concurrent range writers"""
+        extents = full_extent(1024 * 1024)
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=16 * 1024, jobs=4, split_size=1024)
+        with patch('erasure.parallel.is_rotational', return_value=True):
+            assert overwriter._pass_ranges(extents, 0) is None
+        assert len(overwriter._pass_ranges(extents, 0)) == 4
+
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=16 * 1024, jobs=4, jobs_per_device=1,
+                                split_size=1024)
+        assert overwriter._pass_ranges(extents, 0) is None
+
+    def test_range_writers_count_against_the_per_device_limit(self, tmp_path):
+        """Test that split passes of files erased side by side never exceed --jobs-per-device writers"""
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        for i in range(4):
+            (tree / f"large{i}.bin").write_bytes(b"x" * 1024 * 1024)
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=64 * 1024, jobs=4, jobs_per_device=2,
+                                split_size=1024)
+        running = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+        real_write_pass = overwriter._write_pass
+
+        def write_pass(*args, **kwargs):
+            with lock:
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+            time.sleep(0.01)
+            try:
+                return real_write_pass(*args, **kwargs)
+            finally:
+                with lock:
+                    running['now'] -= 1
+
+        overwriter._write_pass = write_pass
+
+        assert overwriter.process_path(str(tree), passes=2) is True
+
+        assert not tree.exists()
+        assert running['max'] == 2
+
+    def test_large_file_pass_is_split_into_concurrent_ranges(self, tmp_path):
+        """Test that a split pass covers every byte of the file"""
+        path = tmp_path / "large.bin"
+        path.write_bytes(os.urandom(300 * 1024))
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=16 * 1024, jobs=4, split_size=256 * 1024)
+        entry = FileEntry.from_path(str(path))
+
+        ranges = overwriter._pass_ranges(full_extent(entry.size), 0)
+        overwriter._write_ranges(entry, entry.size, ranges, ConstantSource(b"\x00"))
+
+        assert len(ranges) == 4
+        assert path.read_bytes() == bytes(300 * 1024)
+        assert overwriter.overwrite_and_delete(str(path), passes=2) is True
+
+
+class TestWalker:
+    """Test cases for the scandir-based tree walker"""
+
+    def _open_fds(self):
+        return len(os.listdir('/proc/self/fd'))
+
+    @contextmanager
+    def _fd_limit(self, headroom):
+        """Allow only `headroom` more open descriptors than are open now"""
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (self._open_fds() + headroom, hard))
+        try:
+            yield
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    def test_walk_yields_files_before_their_directories(self, tmp_path):
+        """Test the post-order listing and the cached stat on each entry"""
+        (tmp_path / "a" / "b").mkdir(parents=True)
+        (tmp_path / "a" / "b" / "deep.txt").write_bytes(b"12345")
+        (tmp_path / "top.txt").write_bytes(b"1")
+
+        order = []
+        for item in walk(str(tmp_path)):
+            if isinstance(item, FileEntry):
+                order.append(("file", os.path.relpath(item.path, tmp_path), item.size))
+            else:
+                order.append(("dir", os.path.relpath(item.path, tmp_path), None))
+            item.release()
+
+        assert order.index(("file", "a/b/deep.txt", 5)) < order.index(("dir", "a/b", None))
+        assert order.index(("dir", "a/b", None)) < order.index(("dir", "a", None))
+        assert ("file", "top.txt", 1) in order
+
+    @pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason="needs /proc/self/fd")
+    def test_process_path_releases_directory_descriptors(self, tmp_path):
+        """Test that erasing a tree serially and in parallel leaks no descriptors"""
+        for jobs in (1, 3):
+            root = tmp_path / f"tree{jobs}"
+            for d in range(4):
+                (root / f"d{d}").mkdir(parents=True)
+                for i in range(3):
+                    (root / f"d{d}" / f"f{i}").write_bytes(b"data")
+            overwriter = Overwriter(Mock(spec=Logger), jobs=jobs)
+            before = self._open_fds()
+
+            assert overwriter.process_path(str(root), passes=1) is True
+
+            assert self._open_fds() == before
+            assert not root.exists()
+
+    def test_symlinked_directory_is_not_descended(self, tmp_path):
+        """Test that, like os.walk, a symlink to a directory is never followed"""
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (outside / "keep.txt").write_bytes(b"keep")
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        (tree / "link").symlink_to(outside)
+
+        overwriter = Overwriter(Mock(spec=Logger))
+        overwriter.process_path(str(tree), passes=1)
+
+        assert (outside / "keep.txt").read_bytes() == b"keep"
+        overwriter.logger.log.assert_not_called()
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_linked_file_is_overwritten_once(self, tmp_path, jobs):
+        """Test that hard links and symlinks to an erased file are only unlinked and logged as aliases"""
+        tree = tmp_path / "tree"
+        (tree / "sub").mkdir(parents=True)
+        (tree / "data.bin").write_bytes(os.urandom(8192))
+        os.link(tree / "data.bin", tree / "sub" / "hardlink.bin")
+        (tree / "sub" / "symlink.bin").symlink_to(tree / "data.bin")
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=4096, jobs=jobs)
+
+        with patch.object(overwriter, '_write_pass', wraps=overwriter._write_pass) as write_pass:
+            assert overwriter.process_path(str(tree), passes=2) is True
+
+        assert write_pass.call_count == 2
+        assert not tree.exists()
+        calls = overwriter.logger.log.call_args_list
+        erased = [c for c in calls if 'alias_of' not in c.kwargs]
+        aliases = [c for c in calls if 'alias_of' in c.kwargs]
+        assert len(erased) == 1 and erased[0].kwargs['bytes_overwritten'] == 8192
+        assert len(aliases) == 2
+        assert all(c.kwargs['alias_of'] == erased[0].args[0] and c.kwargs['bytes_overwritten'] == 0
+                   for c in aliases)
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_broken_symlink_is_not_logged_as_an_alias(self, tmp_path, jobs):
+        """Test that a symlink to an in-tree path that never existed is unlinked without claiming alias_of"""
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        (tree / "data.bin").write_bytes(b"x" * 100)
+        (tree / "broken.bin").symlink_to(tree / "missing.bin")
+        overwriter = Overwriter(Mock(spec=Logger), jobs=jobs)
+
+        assert overwriter.process_path(str(tree), passes=1) is True
+
+        assert not tree.exists()
+        calls = {c.args[0]: c.kwargs for c in overwriter.logger.log.call_args_list}
+        broken = calls[str(tree / "broken.bin")]
+        assert broken['success'] is True and 'alias_of' not in broken
+
+    def test_symlink_whose_target_was_erased_after_the_walk(self, tmp_path):
+        """Test that a symlink whose in-tree target was erased through its own path since the walk is unlinked"""
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        (tree / "data.bin").write_bytes(b"x" * 100)
+        (tree / "link.bin").symlink_to(tree / "data.bin")
+        overwriter = Overwriter(Mock(spec=Logger), jobs=4)
+        link = FileEntry(str(tree / "link.bin"), "link.bin", os.stat(tree / "link.bin"), follow_symlinks=True)
+        # A worker erased the nlink=1 target after the walker stat'ed it through the link
+        (tree / "data.bin").unlink()
+
+        assert overwriter._erase_item(link, 1, root=str(tree)) is True
+
+        assert not os.path.lexists(tree / "link.bin")
+        assert overwriter.logger.log.call_args.kwargs['success'] is True
+
+    def test_symlinks_to_single_link_files_in_parallel(self, tmp_path):
+        """Test that --jobs erases trees of files and in-tree symlinks to them without failures"""
+        for run in range(10):
+            tree = tmp_path / f"tree{run}"
+            (tree / "sub").mkdir(parents=True)
+            for i in range(8):
+                (tree / f"data{i}.bin").write_bytes(b"x" * 100)
+                (tree / "sub" / f"link{i}.bin").symlink_to(tree / f"data{i}.bin")
+            overwriter = Overwriter(Mock(spec=Logger), jobs=4)
+
+            assert overwriter.process_path(str(tree), passes=1) is True
+
+            assert not tree.exists()
+            assert overwriter.logger.log.call_count == 16
+
+    @pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason="needs /proc/self/fd")
+    def test_links_in_many_directories_under_a_low_fd_limit(self, tmp_path):
+        """Test that links waiting for their first path's overwrite hold no directory descriptors"""
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        (tree / "data.bin").write_bytes(b"x" * 100)
+        for i in range(300):
+            (tree / f"snap{i}").mkdir()
+            os.link(tree / "data.bin", tree / f"snap{i}" / "data.bin")
+        overwriter = Overwriter(Mock(spec=Logger), jobs=4)
+
+        with self._fd_limit(64):
+            assert overwriter.process_path(str(tree), passes=1) is True
+
+        assert not tree.exists()
+        assert overwriter.logger.log.call_count == 301
+
+    @pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason="needs /proc/self/fd")
+    def test_queued_small_files_under_a_low_fd_limit(self, tmp_path):
+        """Test that batched files from many directories never hold more directories open than the window"""
+        tree = tmp_path / "tree"
+        for i in range(1200):
+            (tree / f"d{i}").mkdir(parents=True)
+            (tree / f"d{i}" / "f.bin").write_bytes(b"x" * 100)
+        overwriter = Overwriter(Mock(spec=Logger), jobs=4)
+
+        with self._fd_limit(300):
+            assert overwriter.process_path(str(tree), passes=1) is True
+
+        assert not tree.exists()
+
+    def test_directory_seen_twice_is_not_walked_again(self, tmp_path):
+        """Test that a directory reached a second time (as through a bind mount) is reported, not re-walked"""
+        (tmp_path / "loop").mkdir()
+        (tmp_path / "loop" / "inner").mkdir()
+        loop_ino = os.stat(tmp_path / "loop").st_ino
+        root_st = os.stat(tmp_path)
+        real_fstat = os.fstat
+
+        def identity(fd):
+            # Make "loop" look like a bind mount of the root
+            st = real_fstat(fd)
+            return (root_st.st_dev, root_st.st_ino) if st.st_ino == loop_ino else (st.st_dev, st.st_ino)
+
+        with patch('erasure.walker._identity', identity):
+            items = list(walk(str(tmp_path)))
+
+        loops = [item for item in items if isinstance(item, DirectoryLoop)]
+        assert [(item.path, item.first_path) for item in loops] == [(str(tmp_path / "loop"), str(tmp_path))]
+        assert not any(item.path.endswith("inner") for item in items)
+        for item in items:
+            item.release()
 
 
+class TestBenchmarkHarness:
+    """Test cases for the benchmark baseline comparison"""
+
+    def test_compare_flags_only_regressions_beyond_tolerance(self):
+        """Test that only metrics worse than the tolerance are reported"""
+        from benchmarks.harness import compare
+
+        baseline = {"tiny/serial/p1": {"mb_per_s": 100.0, "files_per_s": 1000.0, "p99_ms": 2.0}}
+        results = {"tiny/serial/p1": {"mb_per_s": 85.0, "files_per_s": 950.0, "p99_ms": 3.0},
+                   "huge/serial/p1": {"mb_per_s": 1.0}}
+
+        regressions = compare(results, baseline, tolerance=0.10)
+
+        assert len(regressions) == 2
+        assert any("mb_per_s" in line for line in regressions)
+        assert any("p99_ms" in line for line in regressions)
+
+
+class TestMetrics:
+    """Test cases for the per-phase instrumentation"""
+
+    def test_overwriter_records_every_phase(self, tmp_path):
+        """Test that erasing a file times each phase and counts its bytes"""
+        metrics = Metrics()
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=1000, metrics=metrics)
+        test_file = tmp_path / "f.bin"
+        test_file.write_bytes(b"x" * 2500)
+
+        overwriter.overwrite_and_delete(str(test_file), passes=2)
+        summary = metrics.snapshot()
+
+        assert set(summary["phases"]) == {"open", "generate", "write", "sync", "unlink", "log"}
+        assert summary["phases"]["write"]["operations"] == 6
+        assert summary["counters"] == {"bytes_written": 5000, "files_erased": 1}
+
+    def test_threads_are_merged_and_exported(self, tmp_path):
+        """Test that per-thread figures are summed in the JSON and Prometheus output"""
+        metrics = Metrics()
+
+        def work():
+            metrics.add("write", 0.5)
+            metrics.increment("files_erased")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        metrics.finish()
+
+        json_path = tmp_path / "metrics.json"
+        prom_path = tmp_path / "metrics.prom"
+        metrics.write_json(str(json_path))
+        metrics.write_prometheus(str(prom_path))
+
+        assert json.loads(json_path.read_text())["phases"]["write"] == {"seconds": 2.0, "operations": 4}
+        prom = prom_path.read_text()
+        assert 'secure_erase_phase_seconds_total{phase="write"} 2.0' in prom
+        assert "secure_erase_files_erased_total 4" in prom
+
+
+class TestJobManifest:
+    """Test cases for resumable erase jobs"""
+
+    def test_replay_progress_and_ignore_torn_record(self, tmp_path):
+        """Test that a reopened manifest restores progress and survives a torn last line"""
+        job_file = str(tmp_path / "job.jsonl")
+        job = JobManifest.create(job_file, ["/data"], passes=3)
+        job.checkpoint("/data/a", 1, 4096, force=True)
+        job.mark_done("/data/b", True)
+        job.close()
+        with open(job_file, 'a') as f:
+            f.write('{"type": "done", "pa')
+
+        job = JobManifest.resume(job_file)
+        job.mark_done("/data/c", False)
+        job.close()
+        job = JobManifest.resume(job_file)
+
+        assert job.plan["paths"] == ["/data"]
+        assert job.progress_for("/data/a") == (1, 4096)
+        assert job.result("/data/b") is True
+        assert job.result("/data/c") is False
+        job.close()
+
+    def test_resume_continues_mid_pass(self, tmp_path):
+        """Test that an interrupted file restarts at the recorded pass and offset"""
+        test_file = tmp_path / "f.bin"
+        test_file.write_bytes(b"x" * 5000)
+        job = JobManifest.create(str(tmp_path / "job.jsonl"), [str(test_file)], passes=2)
+        job.checkpoint(str(test_file), 1, 3000, force=True)
+
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=1000, job=job)
+        calls = []
+        real_write_pass = overwriter._write_pass
+
+        def write_pass(f, file_size, extents=None, start_offset=0, on_progress=None, **kwargs):
+            calls.append(start_offset)
+            real_write_pass(f, file_size, extents, start_offset, on_progress, **kwargs)
+
+        overwriter._write_pass = write_pass
+        assert overwriter.process_path(str(test_file), passes=2) is True
+
+        assert calls == [3000]
+        assert job.is_done(str(test_file))
+        job.close()
+
+    def test_finished_files_are_skipped_without_stat(self, tmp_path):
+        """Test that a resumed directory run leaves recorded files alone but counts them"""
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        (tree / "done.txt").write_bytes(b"already handled")
+        (tree / "todo.txt").write_bytes(b"erase me")
+        job = JobManifest.create(str(tmp_path / "job.jsonl"), [str(tree)], passes=1)
+        job.mark_done(str(tree / "done.txt"), True)
+
+        overwriter = Overwriter(Mock(spec=Logger), job=job)
+        result = overwriter.process_path(str(tree), passes=1)
+
+        assert result is True
+        assert (tree / "done.txt").read_bytes() == b"already handled"
+        assert not (tree / "todo.txt").exists()
+        assert overwriter.logger.log.call_count == 1
+        job.close()
+
+
+class TestPlanner:
+    """Test cases for the --plan dry run"""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        tree = tmp_path / "tree"
+        (tree / "sub").mkdir(parents=True)
+        (tree / "small.txt").write_bytes(b"x" * 100)
+        (tree / "sub" / "medium.bin").write_bytes(b"y" * (2 * 1024 * 1024))
+        with open(tree / "sub" / "sparse.img", 'wb') as f:
+            f.truncate(64 * 1024 * 1024)
+        return tree
+
+    def test_scan_counts_sizes_without_modifying_anything(self, tree):
+        """Test that the scan reports logical vs allocated bytes and the size distribution"""
+        before = {p: p.stat().st_mtime_ns for p in tree.rglob("*")}
+        overwriter = Overwriter(Mock(spec=Logger), sparse=True)
+        report = Planner(overwriter, scan_threads=2).plan([str(tree)], passes=3, probe=False)
+
+        assert report.files == 3
+        assert report.directories == 2
+        assert report.logical_bytes == 100 + 2 * 1024 * 1024 + 64 * 1024 * 1024
+        assert report.allocated_bytes < 4 * 1024 * 1024
+        # --sparse only overwrites allocated data
+        assert report.io_bytes == 3 * (100 + 2 * 1024 * 1024)
+        device = next(iter(report.devices.values()))
+        assert device.as_dict(3, True)["size_distribution"]["1 MiB - 16 MiB"] == 1
+        assert {p: p.stat().st_mtime_ns for p in tree.rglob("*")} == before
+        overwriter.logger.log.assert_not_called()
+
+    def test_probe_turns_volume_into_eta(self, tree):
+        """Test that the throughput probe yields an ETA and leaves no temp file behind"""
+        overwriter = Overwriter(Mock(spec=Logger), durability='final')
+        report = Planner(overwriter, probe_bytes=1024 * 1024).plan([str(tree)], passes=2)
+
+        device = next(iter(report.devices.values()))
+        assert device.throughput > 0
+        expected = device.logical_bytes * 2 / device.throughput + 3 * device.sync_latency
+        assert report.eta == pytest.approx(expected)
+        assert not any(p.name.startswith(".secure-erase-probe-") for p in tree.rglob("*"))
+
+
+class TestVerifier:
+    """Test cases for read-back verification of the final pass"""
+
+    @pytest.mark.parametrize("mode, expected_bytes", [("full", 40960), ("sample", 3 * 4096)])
+    def test_verified_erase_is_logged(self, tmp_path, mode, expected_bytes):
+        """Test that a verified erase records the result and the bytes read back"""
+        test_file = tmp_path / "f.bin"
+        test_file.write_bytes(b"x" * 40960)
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=3000, verify=mode, verify_samples=3)
+
+        assert overwriter.process_path(str(test_file), passes=2) is True
+        _, kwargs = overwriter.logger.log.call_args
+        assert kwargs["verified"] is True
+        assert kwargs["bytes_verified"] == expected_bytes
+
+    def test_sampled_blocks_detect_a_mismatch(self, tmp_path):
+        """Test that blocks split across chunks are hashed whole and a changed block is caught"""
+        test_file = tmp_path / "f.bin"
+        data = os.urandom(20000)
+        test_file.write_bytes(data)
+        verifier = Verifier('sample', samples=5, block_size=4096)
+        state = verifier.start([(0, len(data))])
+        for offset in range(0, len(data), 3000):
+            state.observe(offset, memoryview(data)[offset:offset + 3000])
+
+        with open(test_file, 'r+b') as f:
+            assert verifier.check(f.fileno(), state, bytearray(8192)) == (True, 20000)
+            f.seek(state.blocks[2][0])
+            f.write(b"\0")
+            f.flush()
+            matched, _ = verifier.check(f.fileno(), state, bytearray(8192))
+        assert matched is False
+
+    def test_failed_verification_keeps_the_file(self, tmp_path):
+        """Test that a file whose final pass does not read back is logged as failed and kept"""
+        test_file = tmp_path / "f.bin"
+        test_file.write_bytes(b"x" * 5000)
+        overwriter = Overwriter(Mock(spec=Logger), verify='sample')
+
+        with patch.object(Verifier, 'check', return_value=(False, 4096)):
+            assert overwriter.process_path(str(test_file), passes=1) is False
+        assert test_file.exists()
+        _, kwargs = overwriter.logger.log.call_args
+        assert kwargs["success"] is False and kwargs["verified"] is False
+
+
+class TestSchemes:
+    """Test cases for named overwrite methods"""
+
+    def test_pattern_only_checked_when_the_method_has_random_passes(self):
+        """Test that a fixed-pattern method accepts any --pattern, and a random one needs a random source"""
+        assert Overwriter(Mock(spec=Logger), method='zero', pattern='zeros').scheme.name == 'zero'
+        with pytest.raises(ValueError, match="random pattern"):
+            Overwriter(Mock(spec=Logger), method='dod3', pattern='zeros')
+
+    def test_method_fixes_pass_schedule(self, tmp_path):
+        """Test that a method runs its own passes, whatever pass count is asked for"""
+        test_file = tmp_path / "f.bin"
+        test_file.write_bytes(b"x" * 5000)
+        overwriter = Overwriter(Mock(spec=Logger), method='dod3')
+        used = []
+        real_write_pass = overwriter._write_pass
+
+        def write_pass(*args, source=None, **kwargs):
+            used.append(source.name if source is not None else overwriter.pattern)
+            real_write_pass(*args, source=source, **kwargs)
+
+        overwriter._write_pass = write_pass
+        assert overwriter.process_path(str(test_file), passes=1) is True
+
+        assert used == ['pattern:00', 'pattern:ff', 'keystream']
+        _, kwargs = overwriter.logger.log.call_args
+        assert kwargs["verified"] is True
+        assert overwriter.logger.log.call_args[0][1] == 3
+
+    def test_gutmann_fixed_patterns_share_precomputed_buffers(self, tmp_path):
+        """Test that fixed passes come from one page-aligned buffer per pattern and tile correctly"""
+        gutmann = SCHEMES['gutmann35']
+        assert gutmann.passes == 35
+        fixed = [gutmann.source(i) for i in range(35) if gutmann.source(i) is not None]
+        assert len(fixed) == 27
+
+        pattern = b'\x92\x49\x24'
+        assert shared_pattern(pattern) is shared_pattern(pattern)
+        # Backed by an anonymous mmap, so the buffer starts on a page boundary
+        assert type(shared_pattern(pattern).obj).__name__ == 'mmap'
+
+        size = 2 * 1024 * 1024 + 12345
+        test_file = tmp_path / "f.bin"
+        test_file.write_bytes(b"\0" * size)
+        overwriter = Overwriter(Mock(spec=Logger), chunk_size=4 * 1024 * 1024)
+        with open(test_file, 'r+b') as f:
+            overwriter._write_pass(f, size, source=gutmann.source(6))
+        assert test_file.read_bytes() == (pattern * (size // 3 + 1))[:size]
+
+
+class TestPathInput:
+    """Test cases for streamed path lists"""
+
+    def test_read_paths_splits_across_reads(self):
+        """Test newline and NUL separated lists whose entries straddle read blocks"""
+        names = [f"/data/dir{i}/file with spaces {i}" for i in range(50)]
+        with patch.object(path_input, 'READ_SIZE', 7):
+            assert list(read_paths(io.BytesIO("\n".join(names).encode() + b"\n\n"))) == names
+            assert list(read_paths(io.BytesIO("\0".join(names).encode()), nul=True)) == names
+
+    def test_duplicates_and_nested_paths_dropped_lazily(self):
+        """Test that repeats and paths under an earlier directory are skipped as they stream past"""
+        consumed = []
+
+        def source():
+            for path in ["/a/b", "/a/b/c.txt", "/x", "/a/b/", "/x/../x", "/a/bc", "/a"]:
+                consumed.append(path)
+                yield path
+
+        stream = unique_paths(source())
+        assert next(stream) == "/a/b"
+        assert consumed == ["/a/b"]
+        assert list(stream) == ["/x", "/a/bc", "/a"]
+
+
+class TestProgress:
+    """Test cases for progress reporting and output modes"""
+
+    def test_progress_display_is_rate_limited(self):
+        """Test that a burst of completed files redraws the aggregate status at most once per interval"""
+        stream = io.StringIO()
+        reporter = ProgressReporter(stream, log_interval=60)
+        reporter.expect(1000, 1000 * 4096)
+        for i in range(1000):
+            reporter.advance(4096)
+            reporter.file_done(f"/f{i}", True, 1)
+        assert stream.getvalue() == ""
+
+        reporter._next_render = 0
+        reporter.file_done("/last", False, 1)
+        line = stream.getvalue()
+        assert line.count("\n") == 1
+        assert "1001/1000 files (1 failed)" in line and "MB/s" in line
+
+    def test_json_mode_emits_one_event_per_file(self, tmp_path, capsys):
+        """Test NDJSON output with nothing else printed per file or per pass"""
+        stream = io.StringIO()
+        overwriter = Overwriter(Mock(spec=Logger), reporter=JsonReporter(stream))
+        for name in ("a", "b"):
+            (tmp_path / name).write_bytes(b"x" * 1000)
+        overwriter.process_path(str(tmp_path), passes=3)
+
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert sorted((e["event"], os.path.basename(e["path"]), e["success"]) for e in events) == \
+            [("file", "a", True), ("file", "b", True)]
+        assert all(e["bytes_overwritten"] == 1000 and e["passes"] == 3 for e in events)
+        assert capsys.readouterr().out == ""
+
+
+class TestFreeSpaceWipe:
+    """Test cases for --wipe-free-space"""
+
+    MIB = 1024 * 1024
+
+    def test_root_also_fills_the_reserved_blocks(self, tmp_path):
+        """Test that root sizes the wipe by all free blocks, other users by the unreserved ones"""
+        st = Mock(f_bfree=300, f_bavail=100, f_frsize=4096)
+        with patch('os.statvfs', return_value=st):
+            with patch('os.geteuid', return_value=0):
+                assert available_bytes(str(tmp_path)) == 300 * 4096
+            with patch('os.geteuid', return_value=1000):
+                assert available_bytes(str(tmp_path)) == 100 * 4096
+
+    def test_stops_at_reserve_and_removes_fill_files(self, tmp_path):
+        """Test that a reserve just below the current free space bounds the fill"""
+        reserve = available_bytes(str(tmp_path)) - 8 * self.MIB
+        wiper = FreeSpaceWiper(Overwriter(Mock(spec=Logger)), reserve=reserve, fill_size=2 * self.MIB, workers=3)
+
+        wiped = wiper.wipe(str(tmp_path), passes=2)
+
+        assert 0 < wiped <= 9 * self.MIB
+        assert len(wiper._paths) >= 3
+        assert list(tmp_path.iterdir()) == []
+
+    def test_enospc_ends_the_fill(self, tmp_path):
+        """Test that running out of space stops every worker and still cleans up"""
+        calls = []
+
+        def fallocate(fd, offset, length):
+            calls.append(length)
+            if len(calls) > 2:
+                raise OSError(errno.ENOSPC, "No space left on device")
+
+        wiper = FreeSpaceWiper(Overwriter(Mock(spec=Logger)), reserve=0, fill_size=self.MIB, workers=2)
+        with patch.object(os, 'posix_fallocate', fallocate):
+            wiped = wiper.wipe(str(tmp_path), passes=1)
+
+        assert wiped == 2 * self.MIB
+        assert len(calls) == 3
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestDaemon:
+    """Test cases for the erase daemon and its socket protocol"""
+
+    def test_submit_wait_and_shutdown_over_socket(self, tmp_path):
+        """Test that a submitted job is erased and reported through the socket"""
+        targets = []
+        for name in ('a.txt', 'b.txt'):
+            target = tmp_path / name
+            target.write_bytes(b'secret' * 100)
+            targets.append(str(target))
+        socket_path = str(tmp_path / 'd.sock')
+        daemon = EraseDaemon(Overwriter(Mock(spec=Logger)), socket_path, passes=1, workers=2)
+        daemon.start()
+        try:
+            reply = daemon_request(socket_path, {'op': 'submit', 'paths': targets + [str(tmp_path / 'missing')]})
+            assert reply['ok']
+            reply = daemon_request(socket_path, {'op': 'wait', 'job': reply['job'], 'timeout': 30})
+            assert reply['finished']
+            assert reply['job']['state'] == 'done'
+            assert reply['job']['succeeded'] == 2
+            assert daemon_request(socket_path, {'op': 'bogus'}) == {'ok': False, 'error': 'unknown op: bogus'}
+            assert daemon_request(socket_path, {'op': 'shutdown'}) == {'ok': True}
+            daemon.wait()
+        finally:
+            daemon.shutdown()
+        assert not any(os.path.exists(t) for t in targets)
+        assert not os.path.exists(socket_path)
+
+    def test_jobs_share_the_per_device_limit(self, tmp_path):
+        """Test that files of different jobs, trees included, never exceed one writer per device"""
+        overwriter = Overwriter(Mock(spec=Logger), jobs=4, jobs_per_device=1)
+        running = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+        real_erase_entry = overwriter._erase_entry
+
+        def erase_entry(entry, passes, **kwargs):
+            with lock:
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+            time.sleep(0.01)
+            try:
+                return real_erase_entry(entry, passes, **kwargs)
+            finally:
+                with lock:
+                    running['now'] -= 1
+
+        overwriter._erase_entry = erase_entry
+        paths = []
+        for name in ('t1', 't2'):
+            tree = tmp_path / name
+            tree.mkdir()
+            for i in range(4):
+                (tree / f"{i}.bin").write_bytes(b"x" * 100)
+            paths.append(str(tree))
+        (tmp_path / "single.bin").write_bytes(b"y" * 100)
+        paths.append(str(tmp_path / "single.bin"))
+
+        daemon = EraseDaemon(overwriter, str(tmp_path / 'd.sock'), passes=1, workers=4)
+        daemon.start()
+        try:
+            jobs = [daemon.submit([p], passes=1) for p in paths]
+            for job in jobs:
+                assert job.done.wait(30)
+        finally:
+            daemon.shutdown()
+        assert all(job.as_dict()['succeeded'] == 1 for job in jobs)
+        assert running['max'] == 1
+        assert sorted(os.listdir(tmp_path)) == []
+
+    def test_refuses_to_replace_a_regular_file(self, tmp_path):
+        """Test that a socket path naming an ordinary file is left alone"""
+        target = tmp_path / 'notasocket'
+        target.write_bytes(b'keep me')
+        daemon = EraseDaemon(Overwriter(Mock(spec=Logger)), str(target))
+
+        with pytest.raises(OSError, match="not a socket"):
+            daemon.start()
+        assert target.read_bytes() == b'keep me'
+
+    def test_status_while_results_are_recorded(self, tmp_path):
+        """Test that a job's status can be read while pool threads record its results"""
+        daemon = EraseDaemon(Overwriter(Mock(spec=Logger)), str(tmp_path / 'd.sock'))
+        job = daemon.submit([f'/p{i}' for i in range(20000)], passes=1)
+        writer = threading.Thread(target=lambda: [job.record(path, True) for path in job.paths])
+        writer.start()
+        while writer.is_alive():
+            status = job.as_dict(results=True)
+            assert status['completed'] == len(status['results'])
+        writer.join()
+        assert job.as_dict()['succeeded'] == 20000
+
+    def test_priority_order_and_coalescing(self, tmp_path):
+        """Test that the highest priority runs first and small jobs with equal passes share a batch"""
+        daemon = EraseDaemon(Overwriter(Mock(spec=Logger)), str(tmp_path / 'd.sock'), batch_paths=3)
+        low = daemon.submit(['/a', '/b'], passes=1)
+        urgent = daemon.submit(['/c'], passes=2, priority=5)
+        later = daemon.submit(['/d'], passes=1)
+        overflow = daemon.submit(['/e'], passes=1)
+
+        assert daemon._next_batch() == [urgent]
+        assert daemon._next_batch() == [low, later]
+        assert daemon._next_batch() == [overflow]
+        assert low.state == 'running'
+        daemon.submit(['/f'])
+        daemon.shutdown()
+        assert daemon.status()['jobs'][-1]['state'] == 'cancelled'
+
 
 class TestLogger:
     """Test cases for the Logger class"""
@@ -139,8 +1220,21 @@ class TestLogger:
         
         with open(temp_log_file, 'r') as f:
             first_line = f.readline().strip()
-            expected_headers = "Timestamp,File Path,Passes,Success,File Size"
+            expected_headers = ("Timestamp,File Path,Passes,Success,File Size,Bytes Overwritten,"
+                                "Verified,Bytes Verified,Alias Of")
             assert first_line == expected_headers
+
+    def test_legacy_log_keeps_its_columns(self, temp_log_file):
+        """Test that rows appended to an older five-column log stay five columns wide"""
+        with open(temp_log_file, 'w') as f:
+            f.write("Timestamp,File Path,Passes,Success,File Size\n")
+
+        logger = Logger(temp_log_file, echo=False)
+        logger.log("/file.txt", 3, True, file_size=10, bytes_overwritten=10)
+
+        with open(temp_log_file) as f:
+            rows = list(csv.reader(f))
+        assert len(rows[1]) == 5
     
     def test_log_successful_operation(self, temp_log_file):
         """Test logging a successful operation"""
@@ -183,6 +1277,96 @@ class TestLogger:
         assert summary["successful"] == 2
         assert summary["failed"] == 1
 
+    def test_buffered_logger_batches_until_flush(self, temp_log_file):
+        """Test that buffered rows reach the file only when flushed"""
+        os.remove(temp_log_file)
+        logger = BufferedLogger(temp_log_file, flush_rows=100, flush_interval=60)
+        try:
+            logger.log("/file1.txt", 3, True, file_size=10)
+            logger.log("/file2.txt", 3, False, file_size=20)
+            with open(temp_log_file) as f:
+                assert len(f.readlines()) == 1
+
+            logger.flush()
+            with open(temp_log_file) as f:
+                assert len(f.readlines()) == 3
+        finally:
+            logger.close()
+
+    def test_buffered_logger_flushes_on_row_threshold_and_close(self, temp_log_file):
+        """Test the background size-triggered flush and the final flush on close"""
+        os.remove(temp_log_file)
+        logger = BufferedLogger(temp_log_file, flush_rows=2, flush_interval=60)
+        logger.log("/file1.txt", 1, True, file_size=1)
+        logger.log("/file2.txt", 1, True, file_size=2)
+        deadline = time.time() + 5
+        flushed = False
+        while not flushed and time.time() < deadline:
+            with open(temp_log_file) as f:
+                flushed = len(f.readlines()) == 3
+            time.sleep(0.01)
+        assert flushed
+        logger.log("/file3.txt", 1, True, file_size=3)
+        logger.close()
+
+        summary = logger.get_log_summary()
+        assert summary["total"] == 3
+        assert summary["successful"] == 3
+
+
+class TestAuditStore:
+    """Test cases for the SQLite audit backend"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = AuditStore(str(tmp_path / "audit.db"), echo=False)
+        yield store
+        store.close()
+
+    def test_running_totals(self, store):
+        """Test that the counters track every row written"""
+        store.log("/file1.txt", 3, True, file_size=100)
+        store.log("/file2.txt", 1, False, file_size=50)
+        store.log("/file3.txt", 2, True, file_size=25)
+
+        assert store.get_log_summary() == {"total": 3, "successful": 2, "failed": 1, "bytes": 125}
+
+    def test_hard_links_count_their_bytes_once(self, store, tmp_path):
+        """Test that unlinking the other links of an erased file adds nothing to the byte total"""
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        (tree / "a.bin").write_bytes(b"x" * 1000)
+        os.link(tree / "a.bin", tree / "b.bin")
+        overwriter = Overwriter(store, reporter=Mock())
+
+        assert overwriter.process_path(str(tree), passes=1) is True
+
+        assert store.get_log_summary() == {"total": 2, "successful": 2, "failed": 0, "bytes": 1000}
+
+    def test_lookup_by_time_and_path(self, store):
+        """Test the indexed time-range and path queries"""
+        store._write_row(["2026-01-01 10:00:00", "/a", 3, "Yes", 1, 1])
+        store._write_row(["2026-01-02 10:00:00", "/b", 3, "No", 1, 1])
+        store._write_row(["2026-01-03 10:00:00", "/c", 3, "Yes", 1, 1])
+
+        rows = store.erased_between("2026-01-01 12:00:00", "2026-01-03 10:00:00")
+
+        assert [row["path"] for row in rows] == ["/b", "/c"]
+        assert store.was_erased("/a") is True
+        assert store.was_erased("/b") is False
+        assert store.was_erased("/missing") is False
+
+    def test_import_existing_csv(self, store, tmp_path):
+        """Test the one-time importer for erasure_log.csv files"""
+        csv_log = str(tmp_path / "erasure_log.csv")
+        logger = Logger(csv_log, echo=False)
+        logger.log("/old1.txt", 3, True, file_size=10)
+        logger.log("/old2.txt", 3, False)
+
+        assert store.import_csv(csv_log) == 2
+        assert store.get_log_summary() == {"total": 2, "successful": 1, "failed": 1, "bytes": 10}
+        assert store.was_erased("/old1.txt")
+
 
 class TestSecureEraseCLI:
     """Test cases for the CLI interface"""
@@ -248,6 +1432,85 @@ class TestSecureEraseCLI:
         assert passes == 7
         assert mock_input.call_count == 2
 
+    def test_eta_prescan_skips_directories_unless_asked(self, cli, tmp_path):
+        """Test that directory targets are only scanned for an ETA with --eta"""
+        tree = tmp_path / "tree"
+        tree.mkdir()
+        (tree / "a.bin").write_bytes(b"a" * 1000)
+        cli.reporter = Mock()
+
+        cli._expect([str(tree)], passes=2)
+        assert not cli.reporter.expect.called
+
+        cli._expect([str(tree)], passes=2, scan_trees=True)
+        cli.reporter.expect.assert_called_once_with(1, 2000)
+
+    def test_batch_durability_spans_a_list_of_files(self, cli, tmp_path):
+        """Test that a list of single files gets one barrier per --sync-every files, not one each"""
+        paths = []
+        for i in range(10):
+            path = tmp_path / f"f{i}.bin"
+            path.write_bytes(b"x" * 100)
+            paths.append(str(path))
+        cli.logger = Mock(spec=Logger)
+        cli.reporter = Mock(wants_progress=False)
+        args = cli.parser.parse_args(["--durability", "batch", "--sync-every", "256", "--passes", "1"] + paths)
+        cli.overwriter = cli._build_overwriter(args)
+
+        with patch('erasure.durability.syncfs') as syncfs:
+            cli._run_erasure(paths, 1)
+
+        assert syncfs.call_count == 1
+        assert not any(os.path.exists(p) for p in paths)
+
+    def test_resume_from_another_directory_is_refused(self, cli, tmp_path, monkeypatch):
+        """Test that relative job paths are never resolved against a different working directory"""
+        for name in ("a", "b"):
+            (tmp_path / name / "t").mkdir(parents=True)
+            (tmp_path / name / "t" / "keep.txt").write_bytes(b"keep")
+        job_file = str(tmp_path / "job.jsonl")
+        cli.logger = Mock(spec=Logger)
+        monkeypatch.chdir(tmp_path / "a")
+        args = cli.parser.parse_args(["t", "--job-file", job_file, "--passes", "1"])
+        with patch.object(SecureEraseCLI, '_run_erasure', lambda self, paths, passes, job: job.close()):
+            cli._erase_paths(args)
+
+        monkeypatch.chdir(tmp_path / "b")
+        cli.reporter = Mock()
+        cli._resume_job(cli.parser.parse_args(["--job-file", job_file, "--resume"]))
+
+        assert (tmp_path / "b" / "t" / "keep.txt").read_bytes() == b"keep"
+        assert "was started in" in cli.reporter.error.call_args[0][0]
+
+        monkeypatch.chdir(tmp_path / "a")
+        cli._resume_job(cli.parser.parse_args(["--job-file", job_file, "--resume"]))
+        assert not (tmp_path / "a" / "t").exists()
+        assert (tmp_path / "b" / "t" / "keep.txt").exists()
+
+    def test_buffered_log_with_audit_db_is_rejected(self, cli, tmp_path):
+        """Test that --buffered-log is refused rather than silently ignored with --audit-db"""
+        argv = ["secure_erase", "--audit-db", str(tmp_path / "audit.db"), "--buffered-log", "/nothing"]
+        with patch('sys.argv', argv), pytest.raises(SystemExit):
+            cli.run()
+        assert not (tmp_path / "audit.db").exists()
+
+    def test_resume_restores_recorded_options(self, cli, tmp_path):
+        """Test that a resumed job keeps the pattern, sparse and verify options it was started with"""
+        test_file = tmp_path / "f.bin"
+        test_file.write_bytes(b"x" * 5000)
+        job_file = str(tmp_path / "job.jsonl")
+        JobManifest.create(job_file, [str(test_file)], passes=1,
+                           options={'pattern': 'zeros', 'sparse': True, 'verify': 'full', 'method': None}).close()
+        cli.logger = Mock(spec=Logger)
+        args = cli.parser.parse_args(["--job-file", job_file, "--resume"])
+
+        cli._resume_job(args)
+
+        assert cli.overwriter.pattern == 'zeros'
+        assert cli.overwriter.sparse is True
+        assert cli.overwriter.verifier is not None
+        assert not test_file.exists()
+
 
 
 
@@ -0,0 +1,189 @@
+import csv
+import os
+import sqlite3
+from datetime import datetime
+
+from utils.logger import Logger, LOG_HEADERS
+
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS erasures (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    path TEXT NOT NULL,
+    passes INTEGER,
+    success INTEGER NOT NULL,
+    file_size INTEGER,
+    bytes_overwritten INTEGER,
+    verified INTEGER,
+    bytes_verified INTEGER,
+    alias_of TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_erasures_timestamp ON erasures(timestamp);
+CREATE INDEX IF NOT EXISTS idx_erasures_path ON erasures(path);
+
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total INTEGER NOT NULL,
+    successful INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals VALUES (1, 0, 0, 0, 0);
+
+-- Running totals are kept up to date in the same transaction as each row,
+-- so summaries never have to scan the table
+CREATE TRIGGER IF NOT EXISTS erasures_totals AFTER INSERT ON erasures
+BEGIN
+    UPDATE totals SET
+        total = total + 1,
+        successful = successful + NEW.success,
+        failed = failed + (1 - NEW.success),
+        bytes = bytes + CASE WHEN NEW.success THEN COALESCE(NEW.file_size, 0) ELSE 0 END
+    WHERE id = 1;
+END;
+"""
+
+
+def _format_timestamp(value):
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+def _parse_flag(value):
+    """'Yes'/'No' as 1/0; anything else (e.g. 'N/A') is unknown"""
+    value = (value or '').lower()
+    if value in ('yes', 'no'):
+        return 1 if value == 'yes' else 0
+    return None
+
+
+def _parse_path(value):
+    return None if value in (None, '', 'N/A') else value
+
+
+def _parse_size(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AuditStore(Logger):
+    """Audit log backed by SQLite in WAL mode.
+
+    Drop-in replacement for the CSV Logger: rows go into an indexed table
+    and the total/successful/failed/bytes counters are maintained as rows
+    are written, so get_log_summary() is O(1) however large the log grows.
+    """
+
+    def __init__(self, db_file='logs/erasure_log.db', echo=True):
+        self._conn = None
+        super().__init__(db_file, echo=echo)
+
+    def _initialize_log_file(self):
+        """Create the database, its indexes and the counters row if needed"""
+        log_dir = os.path.dirname(self.log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        self._conn = sqlite3.connect(self.log_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(erasures)")}
+            # Databases created by older versions lack the newer columns
+            for column, kind in (('bytes_overwritten', 'INTEGER'), ('verified', 'INTEGER'),
+                                 ('bytes_verified', 'INTEGER'), ('alias_of', 'TEXT')):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE erasures ADD COLUMN {column} {kind}")
+
+    def _write_row(self, row):
+        # Rows in an older, shorter layout leave the newer fields unknown
+        row = list(row) + ['N/A'] * (len(LOG_HEADERS) - len(row))
+        (timestamp, file_path, passes, success_str, file_size, bytes_overwritten,
+         verified, bytes_verified, alias_of) = row
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO erasures (timestamp, path, passes, success, file_size, bytes_overwritten, "
+                    "verified, bytes_verified, alias_of) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (timestamp, file_path, passes, 1 if success_str == 'Yes' else 0,
+                     _parse_size(file_size), _parse_size(bytes_overwritten),
+                     _parse_flag(verified), _parse_size(bytes_verified), _parse_path(alias_of)),
+                )
+        except sqlite3.Error as e:
+            print(f"[!] Warning: Could not write to audit database: {e}")
+
+    def get_log_summary(self):
+        """Get the running totals of logged operations"""
+        with self._lock:
+            total, successful, failed, size = self._conn.execute(
+                "SELECT total, successful, failed, bytes FROM totals WHERE id = 1"
+            ).fetchone()
+        return {"total": total, "successful": successful, "failed": failed, "bytes": size}
+
+    def erased_between(self, start, end):
+        """Return the operations logged between two timestamps (inclusive)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT timestamp, path, passes, success, file_size, bytes_overwritten, verified, bytes_verified, "
+                "alias_of FROM erasures WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp",
+                (_format_timestamp(start), _format_timestamp(end)),
+            )
+            rows = cursor.fetchall()
+        return [
+            {"timestamp": ts, "path": path, "passes": passes, "success": bool(success),
+             "file_size": size, "bytes_overwritten": overwritten,
+             "verified": None if verified is None else bool(verified), "bytes_verified": checked,
+             "alias_of": alias_of}
+            for ts, path, passes, success, size, overwritten, verified, checked, alias_of in rows
+        ]
+
+    def was_erased(self, path):
+        """Return True if path has been successfully erased at least once"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM erasures WHERE path = ? AND success = 1 LIMIT 1", (path,)
+            ).fetchone()
+        return row is not None
+
+    def import_csv(self, csv_path):
+        """Load the rows of an existing erasure_log.csv; returns how many were imported"""
+        count = 0
+
+        def rows(reader):
+            nonlocal count
+            for row in reader:
+                count += 1
+                yield (
+                    row.get('Timestamp', ''),
+                    row.get('File Path', ''),
+                    _parse_size(row.get('Passes')),
+                    1 if (row.get('Success') or '').lower() == 'yes' else 0,
+                    _parse_size(row.get('File Size')),
+                    _parse_size(row.get('Bytes Overwritten')),
+                    _parse_flag(row.get('Verified')),
+                    _parse_size(row.get('Bytes Verified')),
+                    _parse_path(row.get('Alias Of')),
+                )
+
+        with open(csv_path, mode='r', newline='', encoding='utf-8') as file:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO erasures (timestamp, path, passes, success, file_size, bytes_overwritten, "
+                    "verified, bytes_verified, alias_of) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows(csv.DictReader(file)),
+                )
+        return count
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,11 +1,34 @@
+import atexit
 import csv
 import os
+import signal
+import threading
+import weakref
 from datetime import datetime
 
+from config import LOG_FLUSH_ROWS, LOG_FLUSH_INTERVAL
+from utils.metrics import NullMetrics
+
+
+# 'File Size' is the logical size; 'Bytes Overwritten' is what each pass
+# physically wrote, which is smaller for sparse files erased extent by extent.
+# 'Verified' is the result of reading the final pass back (--verify) and
+# 'Bytes Verified' how much of it was read. 'Alias Of' names the path through
+# which a hard-linked file's data was overwritten when this link was only unlinked.
+LOG_HEADERS = ['Timestamp', 'File Path', 'Passes', 'Success', 'File Size', 'Bytes Overwritten',
+               'Verified', 'Bytes Verified', 'Alias Of']
+
 
 class Logger:
-    def __init__(self, log_file='logs/erasure_log.csv'):
+    def __init__(self, log_file='logs/erasure_log.csv', echo=True):
         self.log_file = log_file
+        self.echo = echo
+        # Replaced by the CLI when run metrics are being collected
+        self.metrics = NullMetrics()
+        # Erase workers may log from several threads at once. Re-entrant so a
+        # signal handler running on the main thread can still flush.
+        self._lock = threading.RLock()
+        self._columns = len(LOG_HEADERS)
         self._initialize_log_file()
 
     def _initialize_log_file(self):
@@ -26,34 +49,61 @@ class Logger:
             try:
                 with open(self.log_file, mode='w', newline='', encoding='utf-8') as file:
                     writer = csv.writer(file)
-                    writer.writerow(['Timestamp', 'File Path', 'Passes', 'Success', 'File Size'])
+                    writer.writerow(LOG_HEADERS)
             except IOError as e:
                 print(f"[!] Warning: Could not initialize log file {self.log_file}: {e}")
+        else:
+            # Logs started by older versions have fewer columns; keep their rows
+            # the same width so the file stays readable by csv.DictReader
+            try:
+                with open(self.log_file, mode='r', newline='', encoding='utf-8') as file:
+                    header = next(csv.reader(file), None)
+                if header:
+                    self._columns = len(header)
+            except IOError:
+                pass
 
-    def log(self, file_path, passes, success, file_size=None):
+    def log(self, file_path, passes, success, file_size=None, bytes_overwritten=None,
+            verified=None, bytes_verified=None, alias_of=None):
         """Log an erasure operation"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         success_str = 'Yes' if success else 'No'
         
-        # Get file size if not provided and file still exists
+        # Callers that erased the file pass its size in; only fall back to
+        # stat'ing the path when they could not (e.g. it never existed)
         if file_size is None:
             try:
-                if os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                else:
-                    file_size = 'N/A'
+                file_size = os.path.getsize(file_path)
             except OSError:
                 file_size = 'N/A'
+        if bytes_overwritten is None:
+            bytes_overwritten = 'N/A'
+        verified_str = 'N/A' if verified is None else ('Yes' if verified else 'No')
+        if bytes_verified is None:
+            bytes_verified = 'N/A'
+
+        row = [timestamp, file_path, passes, success_str, file_size, bytes_overwritten,
+               verified_str, bytes_verified, alias_of or 'N/A']
+        self._write_row(row[:self._columns])
+
+        # Also print to console for immediate feedback
+        if self.echo:
+            print(f"[LOG] {timestamp} | File: {file_path} | Passes: {passes} | Success: {success_str}")
 
+    def _write_row(self, row):
+        """Append one row to the CSV file"""
         try:
-            with open(self.log_file, mode='a', newline='', encoding='utf-8') as file:
+            with self._lock, open(self.log_file, mode='a', newline='', encoding='utf-8') as file:
                 writer = csv.writer(file)
-                writer.writerow([timestamp, file_path, passes, success_str, file_size])
+                writer.writerow(row)
         except IOError as e:
             print(f"[!] Warning: Could not write to log file: {e}")
 
-        # Also print to console for immediate feedback
-        print(f"[LOG] {timestamp} | File: {file_path} | Passes: {passes} | Success: {success_str}")
+    def flush(self):
+        """Write out any buffered rows (rows are written immediately here)"""
+
+    def close(self):
+        """Release the log file (nothing is held open here)"""
 
     def get_log_summary(self):
         """Get a summary of logged operations"""
@@ -78,4 +128,104 @@ class Logger:
                 }
         except IOError as e:
             print(f"[!] Could not read log file for summary: {e}")
-            return {"total": 0, "successful": 0, "failed": 0}
\ No newline at end of file
+            return {"total": 0, "successful": 0, "failed": 0}
+
+
+# Buffered loggers that still need flushing if the process is signalled
+_open_loggers = weakref.WeakSet()
+_previous_handlers = {}
+
+
+def _flush_on_signal(signum, frame):
+    """Flush every open buffered logger, then let the signal do what it did before"""
+    for logger in list(_open_loggers):
+        logger.close()
+
+    previous = _previous_handlers.get(signum, signal.SIG_DFL)
+    if callable(previous):
+        previous(signum, frame)
+    elif previous == signal.SIG_DFL:
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+def _install_signal_handlers():
+    # Handlers can only be installed from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for name in ('SIGTERM', 'SIGHUP'):
+        signum = getattr(signal, name, None)
+        if signum is None or signum in _previous_handlers:
+            continue
+        _previous_handlers[signum] = signal.getsignal(signum)
+        signal.signal(signum, _flush_on_signal)
+
+
+class BufferedLogger(Logger):
+    """Logger that keeps the CSV open and writes rows in batches.
+
+    Rows are flushed by a background thread once `flush_rows` are queued or
+    every `flush_interval` seconds, and always on close(), at interpreter
+    exit and on SIGTERM/SIGHUP.
+    """
+
+    def __init__(self, log_file='logs/erasure_log.csv', flush_rows=LOG_FLUSH_ROWS,
+                 flush_interval=LOG_FLUSH_INTERVAL, echo=False):
+        super().__init__(log_file, echo=echo)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._closed = False
+        self._file = open(self.log_file, mode='a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name='log-flusher', daemon=True)
+        self._thread.start()
+
+        _open_loggers.add(self)
+        _install_signal_handlers()
+        atexit.register(self.close)
+
+    def _write_row(self, row):
+        with self._lock:
+            if self._closed:
+                # Late rows after close() still reach the file
+                super()._write_row(row)
+                return
+            self._rows.append(row)
+            full = len(self._rows) >= self.flush_rows
+        if full:
+            self._wakeup.set()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows to the log file"""
+        with self._lock:
+            if self._file.closed:
+                return
+            rows, self._rows = self._rows, []
+            try:
+                with self.metrics.phase('log_flush'):
+                    self._writer.writerows(rows)
+                    self._file.flush()
+            except IOError as e:
+                print(f"[!] Warning: Could not write to log file: {e}")
+
+    def close(self):
+        """Flush remaining rows, stop the background thread and close the file"""
+        # No join here: close() may run from a signal handler that interrupted
+        # a thread holding the lock, so the flusher is simply told to stop
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.flush()
+            self._file.close()
+        self._wakeup.set()
+        _open_loggers.discard(self)
+        atexit.unregister(self.close)
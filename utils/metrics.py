@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Per-phase timers and counters for an erase run.
+
+    The Overwriter times each file's open, generate, write, sync, unlink and
+    log phases; BufferedLogger adds its background log_flush.
+
+    Each thread accumulates into its own dictionaries, so recording on the
+    hot path takes no lock; snapshot() merges them when a report is needed.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._registry = []
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def _thread_slots(self):
+        local = self._local
+        if not hasattr(local, 'timings'):
+            local.timings = {}
+            local.counters = {}
+            with self._lock:
+                self._registry.append((local.timings, local.counters))
+        return local.timings, local.counters
+
+    def add(self, phase, seconds, operations=1):
+        """Record `seconds` spent in `phase` over `operations` calls"""
+        timings, _ = self._thread_slots()
+        slot = timings.get(phase)
+        if slot is None:
+            timings[phase] = [seconds, operations]
+        else:
+            slot[0] += seconds
+            slot[1] += operations
+
+    def increment(self, counter, amount=1):
+        """Add `amount` to a named counter"""
+        _, counters = self._thread_slots()
+        counters[counter] = counters.get(counter, 0) + amount
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of code as one operation of phase `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def finish(self):
+        """Stop the run clock"""
+        self.elapsed = time.perf_counter() - self.started
+
+    def snapshot(self):
+        """Merge every thread's figures into one summary dictionary"""
+        phases = {}
+        counters = {}
+        with self._lock:
+            registry = list(self._registry)
+        for timings, thread_counters in registry:
+            for name, (seconds, operations) in timings.copy().items():
+                merged = phases.setdefault(name, {'seconds': 0.0, 'operations': 0})
+                merged['seconds'] += seconds
+                merged['operations'] += operations
+            for name, value in thread_counters.copy().items():
+                counters[name] = counters.get(name, 0) + value
+
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        for merged in phases.values():
+            merged['seconds'] = round(merged['seconds'], 6)
+        return {'elapsed_seconds': round(elapsed, 6), 'phases': phases, 'counters': counters}
+
+    def write_json(self, path):
+        """Write the summary as JSON"""
+        _atomic_write(path, json.dumps(self.snapshot(), indent=2) + "\n")
+
+    def write_prometheus(self, path, prefix='secure_erase'):
+        """Write the summary in the Prometheus textfile-collector format"""
+        summary = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_run_seconds Wall-clock duration of the erase run.",
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {summary['elapsed_seconds']}",
+            f"# HELP {prefix}_phase_seconds_total Time spent in each erase phase, summed over threads.",
+            f"# TYPE {prefix}_phase_seconds_total counter",
+        ]
+        for name, values in sorted(summary['phases'].items()):
+            lines.append(f'{prefix}_phase_seconds_total{{phase="{name}"}} {values["seconds"]}')
+        lines += [
+            f"# HELP {prefix}_phase_operations_total Number of timed operations in each phase.",
+            f"# TYPE {prefix}_phase_operations_total counter",
+        ]
+        for name, values in sorted(summary['phases'].items()):
+            lines.append(f'{prefix}_phase_operations_total{{phase="{name}"}} {values["operations"]}')
+        for name, value in sorted(summary['counters'].items()):
+            lines += [
+                f"# TYPE {prefix}_{name}_total counter",
+                f"{prefix}_{name}_total {value}",
+            ]
+        # The collector may read at any moment, so never expose a half-written file
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+
+class NullMetrics(Metrics):
+    """Metrics that discard everything; the default when nothing is collected"""
+
+    def add(self, phase, seconds, operations=1):
+        pass
+
+    def increment(self, counter, amount=1):
+        pass
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,219 @@
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+from config import PROGRESS_INTERVAL, PROGRESS_LOG_INTERVAL
+
+
+def format_bytes(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if size < 1024 or unit == 'TiB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    return f"{minutes}m {seconds:02d}s"
+
+
+class Reporter:
+    """Decides what an erase run shows while it works.
+
+    The Overwriter reports everything here instead of printing: per-file
+    messages, warnings ([!]), errors ([X]) and each completed file. This
+    base class shows errors only (--quiet).
+    """
+
+    # Whether advance() should be called with the bytes of every chunk
+    wants_progress = False
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def _print(self, text):
+        with self._lock:
+            print(text, file=self.stream or sys.stdout, flush=True)
+
+    def notice(self, text):
+        """Run-level information, shown unless output is quiet or machine-readable"""
+
+    def message(self, text):
+        """Routine per-file progress; only shown in verbose mode"""
+
+    def warning(self, text):
+        """Something skipped or left behind"""
+
+    def error(self, text):
+        """An operation that failed"""
+        self._print(text)
+
+    def expect(self, files, io_bytes):
+        """Announce work still to come, so an ETA can be shown"""
+
+    def advance(self, nbytes):
+        """Bytes written since the last call (only if wants_progress)"""
+
+    def file_done(self, path, success, passes, **details):
+        """A file has been erased, or failed to be"""
+
+    def summary(self, succeeded, total):
+        """The run is over"""
+
+    def close(self):
+        pass
+
+
+class VerboseReporter(Reporter):
+    """One line per file and per event, as the tool has always printed"""
+
+    def notice(self, text):
+        self._print(text)
+
+    def message(self, text):
+        self._print(text)
+
+    def warning(self, text):
+        self._print(text)
+
+    def summary(self, succeeded, total):
+        self._print(f"\nOperation completed: {succeeded}/{total} paths processed successfully.")
+
+
+class ProgressReporter(Reporter):
+    """A single aggregate status (files, bytes, MB/s, ETA), redrawn at most every `interval` seconds.
+
+    On a terminal the status line is rewritten in place; anywhere else
+    (a pipe, a log collector) a plain line is written every
+    `log_interval` seconds instead. Warnings and errors are still shown.
+    """
+
+    wants_progress = True
+
+    def __init__(self, stream=None, interval=PROGRESS_INTERVAL, log_interval=PROGRESS_LOG_INTERVAL):
+        super().__init__(stream or sys.stderr)
+        self.tty = self.stream.isatty()
+        self.interval = interval if self.tty else log_interval
+        self.files = 0
+        self.failed = 0
+        self.bytes = 0
+        self.expected_files = 0
+        self.expected_bytes = 0
+        self.started = time.monotonic()
+        self._next_render = self.started + self.interval
+        self._drawn = False
+
+    def _write(self, text):
+        # Called with the lock held
+        if self._drawn:
+            self.stream.write("\r\x1b[K")
+            self._drawn = False
+        self.stream.write(text + "\n")
+        self.stream.flush()
+
+    def _print(self, text):
+        with self._lock:
+            self._write(text)
+
+    def notice(self, text):
+        self._print(text)
+
+    def warning(self, text):
+        self._print(text)
+
+    def expect(self, files, io_bytes):
+        with self._lock:
+            self.expected_files += files
+            self.expected_bytes += io_bytes
+
+    def advance(self, nbytes):
+        with self._lock:
+            self.bytes += nbytes
+            self._maybe_render()
+
+    def file_done(self, path, success, passes, **details):
+        with self._lock:
+            self.files += 1
+            if not success:
+                self.failed += 1
+            self._maybe_render()
+
+    def _maybe_render(self):
+        now = time.monotonic()
+        if now >= self._next_render:
+            self._next_render = now + self.interval
+            self._render(now)
+
+    def status(self, now=None, final=False):
+        """The current aggregate status line"""
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        rate = self.bytes / elapsed
+        files = f"{self.files}/{self.expected_files}" if self.expected_files else f"{self.files}"
+        line = f"[→] {files} files"
+        if self.failed:
+            line += f" ({self.failed} failed)"
+        line += f", {format_bytes(self.bytes)} written, {rate / 1e6:.1f} MB/s"
+        if self.expected_bytes and rate > 0 and not final:
+            line += f", ETA {format_duration(max(self.expected_bytes - self.bytes, 0) / rate)}"
+        return line
+
+    def _render(self, now):
+        if self.tty:
+            self.stream.write("\r\x1b[K" + self.status(now))
+            self.stream.flush()
+            self._drawn = True
+        else:
+            self._write(self.status(now))
+
+    def summary(self, succeeded, total):
+        with self._lock:
+            self._write(self.status(final=True) + f" in {format_duration(time.monotonic() - self.started)}")
+        print(f"\nOperation completed: {succeeded}/{total} paths processed successfully.")
+
+    def close(self):
+        with self._lock:
+            if self._drawn:
+                self.stream.write("\n")
+                self.stream.flush()
+                self._drawn = False
+
+
+class JsonReporter(Reporter):
+    """One NDJSON object per completed file on stdout, for other programs to consume.
+
+    Warnings and errors become "warning"/"error" events and the run ends
+    with a "summary" event; nothing else is written to the stream.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(stream or sys.stdout)
+
+    def _emit(self, event):
+        line = json.dumps(event)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def warning(self, text):
+        self._emit({'event': 'warning', 'message': text})
+
+    def error(self, text):
+        self._emit({'event': 'error', 'message': text})
+
+    def file_done(self, path, success, passes, **details):
+        event = {'event': 'file', 'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                 'path': path, 'success': bool(success), 'passes': passes}
+        event.update(details)
+        self._emit(event)
+
+    def summary(self, succeeded, total):
+        self._emit({'event': 'summary', 'succeeded': succeeded, 'total': total})